@@ -12,41 +12,107 @@
 
 import arcpy
 import os
+import functools
+import akapi_core as core
+import CreatePhotoFootprints_AKAPI_ProPy3compatible as cpf
+from akapi_log import get_logger
+from akapi_metrics import start_run, report_path, stage
+from akapi_params import choice_parameter
+from akapi_scratch import Scratch
+from akapi_storage import ArcpyStorage
 
-# Allow overwrite
-arcpy.env.overwriteOutput = True
-
-# Variables as parameters for a geoprocessing tool
-textFilePath=arcpy.GetParameterAsText(0) # photo centers file from Metashape
-
-APSI_Source=arcpy.GetParameterAsText(1)
-SQLstr=arcpy.GetParameterAsText(2)
-fgdbTmp=arcpy.GetParameterAsText(3)
-fcName=arcpy.GetParameterAsText(4) # "APSI_Footprints_ProjectCode"
-obliqueFlag=arcpy.GetParameterAsText(5)
-scaleFlag=arcpy.GetParameterAsText(6)
-missingFramesFlag=arcpy.GetParameterAsText(7)
-fcPolyName=arcpy.GetParameterAsText(8)
-
-#Get the path of the location of the file, so that the tool works if the files are moved.
-tbPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Alaska API Tools.tbx')
-arcpy.ImportToolbox(tbPath)
-
-#Run the two tools
-arcpy.ImportPhotoCenters_AKAPITools(textFilePath, APSI_Source, SQLstr, fgdbTmp, fcName, obliqueFlag, scaleFlag, missingFramesFlag)
-
-aprx = arcpy.mp.ArcGISProject("CURRENT")
-m = aprx.activeMap
-out_fc_lyr = m.listLayers()[0]
-ref_lyrx = "Air_Photo_Center.lyrx" 
-arcpy.ApplySymbologyFromLayer_management(out_fc_lyr, ref_lyrx)
-arcpy.SetParameterAsText(9, out_fc_lyr)
-
-arcpy.GenerateFootprints_AKAPITools(APSI_Source, SQLstr, fgdbTmp, fcPolyName)
-
-aprx = arcpy.mp.ArcGISProject("CURRENT")
-m = aprx.activeMap
-out_fc_lyr = m.listLayers()[0]
-ref_lyrx = "Air_Photo_Footprints.lyrx" 
-arcpy.ApplySymbologyFromLayer_management(out_fc_lyr, ref_lyrx)
-arcpy.SetParameterAsText(10, out_fc_lyr)
\ No newline at end of file
+log = get_logger('combine')
+
+#Import photo centers and generate footprints in one pass over the selected
+#APSI rows: centers are joined and corners computed in memory, and only rows
+#whose centers or corners change are written back to the APSI source.
+def main():
+    # Allow overwrite
+    arcpy.env.overwriteOutput = True
+
+    # Variables as parameters for a geoprocessing tool
+    textFilePath=arcpy.GetParameterAsText(0) # photo centers file from Metashape
+
+    APSI_Source=arcpy.GetParameterAsText(1)
+    SQLstr=arcpy.GetParameterAsText(2)
+    fgdbTmp=arcpy.GetParameterAsText(3)
+    fcName=arcpy.GetParameterAsText(4) # "APSI_Footprints_ProjectCode"
+    obliqueFlag=arcpy.GetParameterAsText(5)
+    scaleFlag=arcpy.GetParameterAsText(6)
+    missingFramesFlag=arcpy.GetParameterAsText(7)
+    fcPolyName=arcpy.GetParameterAsText(8)
+    # Method used to estimate missing frames: 'linear' (default) or 'spline'.
+    # Optional, not yet defined by the tool in older toolboxes (see README.md)
+    interpMethod=choice_parameter(11, ('linear', 'spline'), 'linear')
+
+    sr = arcpy.SpatialReference(4326)   # WGS 84
+
+    #Stage timings and row counts of the run, written next to the output
+    #workspace (see akapi_metrics)
+    params = {'photo_centers': textFilePath, 'apsi_source': APSI_Source,
+              'sql': SQLstr, 'workspace': fgdbTmp, 'points': fcName,
+              'oblique': obliqueFlag, 'scale': scaleFlag,
+              'missing_frames': missingFramesFlag, 'footprints': fcPolyName,
+              'method': interpMethod}
+    with start_run('combine', params, report_path(fgdbTmp, 'combine')):
+        arcpy.env.workspace = fgdbTmp
+        storage = ArcpyStorage(APSI_Source, SQLstr)
+
+        # Intermediate datasets of this run
+        with Scratch(fgdbTmp) as scratch:
+            log.info('Importing photo centers...')
+            files = core.list_photo_center_files(textFilePath)
+            msPhotoCenters, centers = core.load_centers(
+                files, storage, obliqueFlag == 'true', missingFramesFlag == 'true',
+                interpMethod)
+            if (obliqueFlag == 'true'):
+                uFields = core.OBLIQUE_FIELDS[0]
+                updateRow = core.update_oblique_row
+            else:
+                uFields = core.VERTICAL_FIELDS[0]
+                # Estimate missing photo scales unless the scale flag is unchecked
+                updateRow = functools.partial(core.update_vertical_row,
+                                              scale=scaleFlag != 'false')
+
+            log.info('Generating photo footprints...')
+            changes, matched, unmatched = core.update_photos(
+                storage, uFields, centers, updateRow, cpf.parallel_processes())
+            core.report_join(centers, matched, unmatched)
+            core.report_files(msPhotoCenters, matched)
+            storage.update(uFields + core.CORNER_FIELDS, changes)
+
+            # Photo centers feature class, from the updated APSI rows
+            if fcName or fcPolyName:
+                tv = arcpy.MakeTableView_management(APSI_Source, 'APSI_Select', SQLstr)
+                if fcName:
+                    ptsFC = os.path.join(fgdbTmp, fcName)
+                else:
+                    ptsFC = scratch.path('APSIselect')
+                with stage('points'):
+                    arcpy.XYTableToPoint_management(tv, ptsFC, 'CENTER_LON', 'CENTER_LAT', "", sr)
+
+            if fcPolyName:
+                log.info(' Building Photo Corner Polygons.')
+                cpf.BuildPolys(ptsFC, fgdbTmp, fcPolyName)
+
+        if fcName:
+            AddLayer(os.path.join(fgdbTmp, fcName), "Air_Photo_Center.lyrx", 9)
+        if fcPolyName:
+            AddLayer(os.path.join(fgdbTmp, fcPolyName), "Air_Photo_Footprints.lyrx", 10)
+
+#Function to add a feature class to the current map with the symbology of a
+#layer file and set it as the output parameter param
+def AddLayer(path, ref_lyrx, param):
+    try:
+        aprx = arcpy.mp.ArcGISProject("CURRENT")
+        m = aprx.activeMap
+        m.addDataFromPath(path)
+        out_fc_lyr = m.listLayers()[0]
+        arcpy.ApplySymbologyFromLayer_management(out_fc_lyr, ref_lyrx)
+        arcpy.SetParameterAsText(param, out_fc_lyr)
+    except Exception as e:
+        log.warning(e)
+        log.warning("!{0} could not be added to your current map.".format(os.path.basename(path)))
+
+if __name__ == '__main__':
+    main()
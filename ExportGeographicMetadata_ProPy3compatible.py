@@ -2,83 +2,255 @@
 # ------------------------------------------------------------------------------
 # Name:      Export EROS Frame Metadata
 #
-#    This Python code is used to export photo centers in EROS metadata 
-#    for scanned aerial frames so they can be imported to Metashape. 
+#    This Python code is used to export photo centers in EROS metadata
+#    for scanned aerial frames so they can be imported to Metashape.
 #    Created at the National Operations Center, Bureau of Land Management.
 #
+#    Frames are read from EROS frame metadata shapefiles or straight from the
+#    APSI table, with an optional SQL selection (e.g. one project) that is
+#    run by the database. Only the fields needed are read.
+#
+#    Several frame metadata shapefiles (e.g. one per project) can be given,
+#    separated by semicolons: one text file is written for each, named after
+#    the shapefile, in the folder of the output text file (or in the output
+#    folder). Files are exported in parallel as set by the Parallel
+#    Processing Factor environment. Text files ending in .gz are compressed.
+#
 # Author:    Julian Cross, jcross@blm.gov
 # Created:   7/9/2020
 # ------------------------------------------------------------------------------
 
 import arcpy
+import concurrent.futures
+import gzip
+import itertools
+import logging
+import math
+import os
+import numpy as np
+from akapi_core import processes_from_factor, set_worker_executable
+from akapi_log import get_logger, Progress, RecordHandler, replay
+from akapi_metrics import start_run, report_path, stage, count
+from akapi_params import optional_parameter
+
+log = get_logger('export')
+
+# Size of the write buffer of the text files
+BUFFER_SIZE = 1 << 20
 
-# Allow overwrite
-arcpy.env.overwriteOutput = True
+# Rows read from the cursor and formatted at a time
+BATCH_ROWS = 10000
 
-# Variables as parameters for a geoprocessing tool
-shp=arcpy.GetParameterAsText(0)
-textFilePath=arcpy.GetParameterAsText(1)
-altitudeFlag=arcpy.GetParameterAsText(2)
-groundOffset=arcpy.GetParameterAsText(3)
-fileExtension=arcpy.GetParameterAsText(4)
+# Fields read from the EROS frame metadata shapefiles and from the APSI
+# table: photo ID, longitude, latitude, scale and focal length
+eros_fields = ['Photo ID', 'Center L_2', 'Center L_1', 'Scale', 'Focal Leng']
+apsi_fields = ['USGS_ENTITY_ID_NO', 'CENTER_LON', 'CENTER_LAT',
+               'PHOTO_SCALE_QTY', 'LENS_FOCAL_LENGTH_QTY']
 
-# Default value
-if len(groundOffset) < 1:
-    groundOffset = str('0')
+# Column headers of the text file
+hdr_str='#Label	X/Longitude	Y/Latitude	Z/Altitude	X_est	Y_est	Z_est'
 
 def main():
-    
+
+    # Allow overwrite
+    arcpy.env.overwriteOutput = True
+
+    # Variables as parameters for a geoprocessing tool
+    shp=arcpy.GetParameterAsText(0)
+    textFilePath=arcpy.GetParameterAsText(1)
+    altitudeFlag=arcpy.GetParameterAsText(2)
+    groundOffset=arcpy.GetParameterAsText(3)
+    fileExtension=arcpy.GetParameterAsText(4)
+    # Selection of the APSI rows. Optional, not yet defined by the tool in
+    # older toolboxes (see README.md)
+    SQLstr=optional_parameter(5)
+
+    # Default value
+    if len(groundOffset) < 1:
+        groundOffset = str('0')
+
+    # One or more shapefiles, separated by semicolons
+    inputs = [item.strip().strip('\'"') for item in shp.split(';') if item.strip()]
+    outputs = OutputPaths(inputs, textFilePath)
+
+    # Stage timings and row counts of the run, written next to the text file
+    # (see akapi_metrics)
+    params = {'frames': shp, 'text_file': textFilePath, 'altitude': altitudeFlag,
+              'ground_offset': groundOffset, 'extension': fileExtension,
+              'sql': SQLstr}
+    with start_run('export', params, report_path(textFilePath, 'export')):
+        processes = min(len(inputs),
+                        processes_from_factor(arcpy.env.parallelProcessingFactor))
+        args = (itertools.repeat(altitudeFlag == 'true'),
+                itertools.repeat(float(groundOffset)),
+                itertools.repeat(fileExtension),
+                itertools.repeat(SQLstr))
+        with stage('export') as timer:
+            if processes < 2:
+                counts = list(map(ExportFrames, inputs, outputs, *args))
+            else:
+                log.info('Exporting {0} files in {1} processes'.format(len(inputs), processes))
+                set_worker_executable()
+                with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                    counts = []
+                    for rows, records in pool.map(ExportWorker, inputs, outputs, *args):
+                        replay(records)
+                        counts.append(rows)
+            timer.rows = sum(counts)
+        count('files', len(outputs))
+        for path, rows in zip(outputs, counts):
+            log.info('{0}: {1} frames'.format(path, rows))
+
+# Function to export a file in a worker process. Returns the number of frames
+# exported and the messages of the export, which the tool logs: messages sent
+# to the geoprocessing messages by a worker process do not reach the tool.
+def ExportWorker(*args):
+    logger = get_logger()
+    handlers = logger.handlers[:]
+    records = []
+    logger.handlers = [RecordHandler(records)]
+    try:
+        return ExportFrames(*args), records
+    finally:
+        logger.handlers = handlers
+
+# Function to name the text file of each shapefile. A single shapefile is
+# exported to textFilePath. Several are exported to textFilePath_<name> (with
+# the extension of textFilePath), or to <name>.txt if textFilePath is a folder.
+def OutputPaths(inputs, textFilePath):
+    if len(inputs) == 1 and not os.path.isdir(textFilePath):
+        return [textFilePath]
+
+    if os.path.isdir(textFilePath):
+        stem, ext = textFilePath, '.txt'
+    else:
+        stem, ext = os.path.splitext(textFilePath)
+        if ext.lower() == '.gz':
+            stem, ext = os.path.splitext(stem)[0], os.path.splitext(stem)[1] + ext
+    outputs = []
+    for path in inputs:
+        name = os.path.splitext(os.path.basename(path.rstrip('\\/')))[0]
+        if os.path.isdir(textFilePath):
+            outputs.append(os.path.join(stem, name + ext))
+        else:
+            outputs.append('{0}_{1}{2}'.format(stem, name, ext))
+    if len(set(outputs)) < len(outputs):
+        msg = 'Shapefiles with the same name would be exported to the same text file'
+        log.error(msg)
+        raise ValueError(msg)
+    return outputs
+
+# Function to open a text file for writing, compressed if it ends in .gz
+def OpenText(path):
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'wt', compresslevel=6)
+    return open(path, 'w', buffering=BUFFER_SIZE)
+
+# Function to find the fields of the frames of shp: the APSI fields if shp is
+# an APSI table, the EROS fields otherwise
+def FrameFields(shp):
+    names = set(field.name.upper() for field in arcpy.ListFields(shp))
+    if all(fld.upper() in names for fld in apsi_fields):
+        return apsi_fields
+    return eros_fields
+
+# Function to read a focal length, a number of mm or text such as '152.4 mm'
+def ParseFocal(value):
+    if isinstance(value, str):
+        return float(value.replace(' mm', ''))
+    return float(value)
+
+# Function to read the focal lengths of values as an array of mm (NaN for
+# nulls). Each distinct value is parsed once and kept in focalTable, as the
+# frames of a project are taken with only a few lenses.
+def FocalLengths(values, focalTable):
+    for value in set(values) - set(focalTable):
+        focalTable[value] = np.nan if value is None else ParseFocal(value)
+    return np.array([focalTable[value] for value in values], dtype=float)
+
+# Function to find the photo centers of values that are null or 0, which are
+# written as None
+def NullCenters(values):
+    centers = np.array(values, dtype=float)
+    return (np.isnan(centers) | (centers == 0)).tolist()
+
+# Function to format the lines of a batch of rows (photo ID, longitude,
+# latitude, scale and focal length). Flying heights and null photo centers
+# are computed for the whole batch.
+def FormatFrames(rows, apsi, altitude, groundOffset, fileExtension, focalTable):
+    photo_ids, lon, lat, scale, focal = zip(*rows)
+    if apsi:
+        photo_ids = [pid[2:] if pid and pid.startswith('AR') else pid
+                     for pid in photo_ids]
+
+    # Check for altitude flag and set z value
+    if altitude:
+        # Estimate z coord or flying height, H (in agl) based on
+        # H = S * fl, where: S = scale (:) and fl = focal length (mm)
+        s = np.array(scale, dtype=float)
+        fl = FocalLengths(focal, focalTable)
+        z_est = (s * fl) * 0.001 # conversion factor mm to m
+        h_est = z_est + groundOffset
+        #h_est = ((row[3] + float(groundOffset))/3.28) # read h from EROS
+        z = [None if math.isnan(h) else h for h in h_est.tolist()]
+    else:
+        z = itertools.repeat(None)
+
+    # For each row write PHOTO_ID and photo center x and y coords
+    return [u'{0}{1}\t{2}\t{3}\t{4}\n'.format(pid, fileExtension,
+                                             None if null_x else x,
+                                             None if null_y else y, h)
+            for pid, x, y, null_x, null_y, h in zip(photo_ids, lon, lat,
+                                                    NullCenters(lon),
+                                                    NullCenters(lat), z)]
+
+# Function to export the frames of the shapefile (or APSI table) shp selected
+# by the SQL statement SQLstr to the text file textFilePath. Rows are
+# streamed from the cursor in batches, formatted with FormatFrames and written
+# to the buffered text file. Returns the number of frames exported.
+def ExportFrames(shp, textFilePath, altitude, groundOffset, fileExtension, SQLstr=''):
+
+    # APSI entity IDs are the photo IDs with the prefix AR, photo centers and
+    # photo scales that are not known yet are null
+    fields = FrameFields(shp)
+    apsi = fields is apsi_fields
+
+    # Access the spatial reference of the shapefile. APSI centers are
+    # latitudes and longitudes in WGS 84, whatever the table is stored in.
+    if apsi:
+        ref = arcpy.SpatialReference(4326)
+    else:
+        ref = arcpy.Describe(shp).spatialReference
+    wkt = ref.exportToString()
+
     # Open textfile and write to it
-    file = open(textFilePath,"w") 
-    
-    # Access the spatial reference of the shapefile
-    ref = arcpy.Describe(shp).spatialReference
-    
-    # Write spatial reference as WKT
-    arcpy.AddMessage(ref.exportToString())
-    file.write('#CoordinateSystem: ')
-    file.write(ref.exportToString())
-    file.write('\n')
-    
-    # Write column headers
-    hdr_str='#Label	X/Longitude	Y/Latitude	Z/Altitude	X_est	Y_est	Z_est'
-    arcpy.AddMessage(hdr_str)
-    file.write(hdr_str)
-    file.write('\n')
-    
-    # Fields to be written to textfile      
-    fields = ['Photo ID', 'Center L_2', 'Center L_1',
-              'Flying Hei', 'Scale', 'Focal Leng']
-    
-    # Create a search cursor to query shapefile data
-    with arcpy.da.SearchCursor(shp, fields) as cursor:
-        for row in cursor:
-            
-            # Estimate z coord or flying height, H (in agl) based on
-            # H = S * fl, where: S = scale (:) and fl = focal length (mm)
-            s = row[4]
-            fl = float(row[5].replace(' mm', ''))
-            z_est = (s * fl) * 0.001 # conversion factor mm to m
-            h_est = z_est + float(groundOffset)
-            #h_est = ((row[3] + float(groundOffset))/3.28) # read h from EROS
-            
-            # Check for altitude flag and set z value
-            z = h_est if (altitudeFlag == 'true') else None
-
-            # For each row write PHOTO_ID and photo center x and y coords
-            arcpy.AddMessage(u'{0}{1}, {2}, {3}, {4}'.format(
-                    row[0],
-                    fileExtension,
-                    None if float(row[1])==0 else row[1],
-                    None if float(row[2])==0 else row[2],
-                    z))    
-            file.write(u'{0}{1}\t{2}\t{3}\t{4}'.format(
-                    row[0],
-                    fileExtension,
-                    None if float(row[1])==0 else row[1],
-                    None if float(row[2])==0 else row[2],
-                    z))
-            file.write('\n')
-            
+    with OpenText(textFilePath) as file:
+        # Write spatial reference as WKT
+        log.info(wkt)
+        file.write('#CoordinateSystem: ' + wkt + '\n')
+
+        # Write column headers
+        log.info(hdr_str)
+        file.write(hdr_str + '\n')
+
+        # Create a search cursor to query shapefile data
+        progress = Progress(log, 'exporting frames')
+        debug = log.isEnabledFor(logging.DEBUG)
+        focalTable = {}
+        # The selection is run by the database
+        with arcpy.da.SearchCursor(shp, fields, SQLstr or None) as cursor:
+            while True:
+                rows = list(itertools.islice(cursor, BATCH_ROWS))
+                if not rows:
+                    break
+                lines = FormatFrames(rows, apsi, altitude, groundOffset,
+                                     fileExtension, focalTable)
+                if debug:
+                    for line in lines:
+                        log.debug(line.rstrip('\n'))
+                file.writelines(lines)
+                progress.update(len(rows))
+    return progress.done()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
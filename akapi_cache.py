@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Parse Cache
+#
+#   Cache of parsed Metashape photo centers files. A file is cached under a
+#   key made of the hash of its content and the parse options, so a file is
+#   parsed again only when it changes. Parsed columns are saved as numpy
+#   arrays (.npz), which load much faster than the text is parsed. The least
+#   recently used files are deleted when the cache grows over its size.
+#
+#   The cache is in the user cache folder (%LOCALAPPDATA%\akapi\cache on
+#   Windows, ~/.cache/akapi elsewhere). Set AKAPI_CACHE to another folder,
+#   or to 0 to not cache, and AKAPI_CACHE_MB to its size (default 256 MB).
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+
+from akapi_log import get_logger
+
+log = get_logger('cache')
+
+# Changing the layout of cached files invalidates the cache
+CACHE_VERSION = 1
+
+CACHE_MB = 256
+
+# Marks the null mask of a column of text in a cache file
+NULL_SUFFIX = '__null'
+
+
+def cache_dir():
+    # Folder of the parse cache, or None if caching is disabled
+    setting = os.environ.get('AKAPI_CACHE', '')
+    if setting.lower() in ('0', 'false', 'off'):
+        return None
+    if setting:
+        return setting
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'akapi', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'akapi')
+
+
+def file_digest(path, block=1 << 20):
+    # SHA-256 of the content of the file path
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(block), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class ParseCache(object):
+    # Parsed files (dataframes) by key in the folder directory, at most
+    # max_bytes in all
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('AKAPI_CACHE_MB', CACHE_MB)) * 2**20)
+        self.max_bytes = max_bytes
+
+    def key(self, path, options):
+        # Key of the file path parsed with options (a JSON serializable dict)
+        options = json.dumps(options, sort_keys=True)
+        text = '{0}\n{1}\n{2}'.format(CACHE_VERSION, file_digest(path), options)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        # The dataframe cached under key, or None
+        import pandas as pd
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                names = json.loads(str(data['__columns__']))
+                columns = {}
+                for name in names:
+                    values = data[name]
+                    if name + NULL_SUFFIX in data.files:
+                        values = values.astype(object)
+                        values[data[name + NULL_SUFFIX]] = np.nan
+                    columns[name] = values
+        except (IOError, OSError, KeyError, ValueError) as e:
+            if os.path.exists(path):
+                log.debug('Cannot read cache file {0}: {1}'.format(path, e))
+            return None
+        # Mark the file as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return pd.DataFrame(columns, columns=names)
+
+    def put(self, key, frame):
+        # Cache the dataframe frame under key. Columns of text are saved as
+        # unicode arrays with a mask of their null values.
+        arrays = {'__columns__': np.array(json.dumps(list(frame.columns)))}
+        for name in frame.columns:
+            values = np.asarray(frame[name])
+            if values.dtype.kind not in 'biuf':
+                null = frame[name].isnull().values
+                arrays[name] = np.array(['' if n else str(v)
+                                         for v, n in zip(values.tolist(), null)], dtype=str)
+                if null.any():
+                    arrays[name + NULL_SUFFIX] = null
+            else:
+                arrays[name] = values
+        path = self._path(key)
+        tmp = '{0}.{1}.tmp'.format(path, uuid.uuid4().hex[:8])
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except (IOError, OSError, ValueError) as e:
+            log.debug('Cannot write cache file {0}: {1}'.format(path, e))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def evict(self):
+        # Delete the least recently used files until the cache fits in
+        # max_bytes
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.npz')]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(entry[1] for entry in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def parse_cache():
+    # The parse cache, or None if caching is disabled
+    directory = cache_dir()
+    if directory is None:
+        return None
+    return ParseCache(directory)
@@ -0,0 +1,749 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Core
+#
+#   Computations of the AK API tools that do not need arcpy: reading Metashape
+#   photo centers files, estimating missing frames and photo scale, joining
+#   photo centers to APSI rows and computing photo corners. APSI rows are read
+#   and written through a storage backend (see akapi_storage), so the same
+#   code runs in the ArcGIS Pro tools and headless on a local copy of the
+#   APSI table:
+#
+#       python akapi_core.py photos.txt apsi.gpkg APSI "FLIGHT_LINE_NAME = 'x'"
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import concurrent.futures
+import glob
+import math
+import os
+import sys
+
+import numpy as np
+
+from akapi_cache import parse_cache
+from akapi_log import get_logger, Progress
+from akapi_reader import VERTICAL, OBLIQUE, read_header, read_columns, iter_chunks
+from akapi_metrics import stage, count, report_path, start_run
+
+# pandas (and scipy for spline estimates) are imported by the functions that
+# use them, to keep importing this module and the tools fast
+
+# Photo centers files larger than this are parsed in chunks of rows
+STREAM_BYTES = 256 * 2**20
+
+log = get_logger('core')
+
+# APSI fields used to compute the photo corners
+FRAME_FIELDS = {'key': 'VENDOR_ID',
+                'project': 'FLIGHT_LINE_NAME',
+                'roll': 'ROLL_NO',
+                'flight': 'FLIGHT_LINE_NO',
+                'scale': 'PHOTO_SCALE_QTY',
+                'lat': 'CENTER_LAT',
+                'lon': 'CENTER_LON',
+                'exposure': 'PHOTO_FRAME_NO'}
+
+# APSI photo corner fields
+CORNER_FIELDS = ['UR_LON', 'UR_LAT', 'UL_LON', 'UL_LAT',
+                 'LL_LON', 'LL_LAT', 'LR_LON', 'LR_LAT']
+
+# APSI metadata fields to update and photo center fields they are updated
+# from, for vertical and oblique photos
+VERTICAL_FIELDS = (['USGS_ENTITY_ID_NO', 'CENTER_LAT', 'CENTER_LON',
+                    'PHOTO_SCALE_QTY', 'LENS_FOCAL_LENGTH_QTY'],
+                   ['PhotoID', 'Latitude', 'Longitude', 'PhotoHeight'])
+OBLIQUE_FIELDS = (['USGS_ENTITY_ID_NO', 'CENTER_LAT', 'CENTER_LON',
+                   'OBLIQUE_DIR_TXT'],
+                  ['PhotoID', 'Latitude', 'Longitude', 'Direction'])
+
+# APSI fields locating a frame on its flight line
+LINE_FIELDS = ['USGS_ENTITY_ID_NO', 'ROLL_NO', 'FLIGHT_LINE_NO',
+               'PHOTO_FRAME_NO']
+
+
+# ---------------------------------------------------------------- photo centers
+
+def list_photo_center_files(path):
+    # List the Metashape photo centers files given as a file, a folder of
+    # .txt files, or a list of either separated by semicolons
+    files = []
+    for item in path.split(';'):
+        item = item.strip().strip('\'"')
+        if not item:
+            continue
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item, '*.txt'))))
+        else:
+            files.append(item)
+
+    if not files:
+        msg = 'No Metashape photo centers files found in: {0}'.format(path)
+        log.error(msg)
+        raise ValueError(msg)
+    log.info('{0} photo centers files to import...'.format(len(files)))
+    return files
+
+
+def read_photo_center_files(files, layout, cols):
+    # Read the columns cols of Metashape photo centers files of the layout
+    # layout (see akapi_reader) concurrently into one dataframe, with the APSI
+    # entity ID of each photo in column EntityID and the name of its file in
+    # column File. Files parsed before are read from the parse cache (see
+    # akapi_cache), files larger than STREAM_BYTES are parsed in chunks. The
+    # coordinate system of each file is in the attribute crs of the dataframe
+    # ({file name: WKT}).
+    import pandas as pd
+    cache = parse_cache()
+    hits = []
+
+    def read_file(path):
+        header = read_header(path)
+        if header.layout is not None and header.layout != layout:
+            msg = '{0} has {1} photo centers, the tool is set for {2} photos'.format(
+                path, header.layout, layout)
+            log.error(msg)
+            raise ValueError(msg)
+        if cache is not None:
+            key = cache.key(path, {'layout': layout, 'cols': cols})
+            frame = cache.get(key)
+            if frame is not None:
+                hits.append(path)
+                return header, frame
+        if os.path.getsize(path) > STREAM_BYTES:
+            frame = read_chunks(path, layout, cols, header)
+        else:
+            frame = read_columns(path, layout, cols, header)
+            frame['EntityID'] = normalize_photo_ids(frame.PhotoID)
+        if cache is not None:
+            cache.put(key, frame)
+        return header, frame
+
+    workers = min(len(files), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(read_file, files))
+    if cache is not None:
+        cache.evict()
+        count('files_cached', len(hits))
+        if hits:
+            log.info('{0} photo centers files read from the parse cache'.format(len(hits)))
+
+    crs = {}
+    for path, (header, frame) in zip(files, results):
+        frame['File'] = os.path.basename(path)
+        crs[os.path.basename(path)] = header.crs
+    if len(set(wkt for wkt in crs.values() if wkt)) > 1:
+        log.warning('The photo centers files are in different coordinate systems')
+    ms = pd.concat([frame for header, frame in results], ignore_index=True)
+    ms.attrs['crs'] = crs
+    return ms
+
+
+def read_chunks(path, layout, cols, header):
+    # Read the columns cols of a large photo centers file in chunks (see
+    # read_photo_center_files). Each chunk is reduced to the arrays of cols
+    # and EntityID as it is read: numbers are copied out of the chunk, so it
+    # is released, and text is kept as it was parsed. The arrays of each
+    # column are then joined and released one column at a time, so the file
+    # is held in memory about once, plus one column.
+    import pandas as pd
+    columns = dict((name, []) for name in cols + ['EntityID'])
+    for frame in iter_chunks(path, layout, cols, header=header):
+        frame['EntityID'] = normalize_photo_ids(frame.PhotoID)
+        for name, arrays in columns.items():
+            column = frame[name]
+            if column.dtype.kind == 'f':
+                arrays.append(column.to_numpy(copy=True))
+            else:
+                arrays.append(column)
+    data = {}
+    for name in list(columns):
+        arrays = columns.pop(name)
+        if isinstance(arrays[0], np.ndarray):
+            data[name] = pd.Series(np.concatenate(arrays), copy=False)
+        else:
+            data[name] = pd.concat(arrays, ignore_index=True)
+    return pd.DataFrame(data, copy=False)
+
+
+def normalize_photo_ids(photo_ids):
+    # Convert Metashape photo labels to APSI entity IDs
+    # e.g. 1234567890123.tif -> AR1234567890123
+    return 'AR' + photo_ids.str[0:13].str.upper()
+
+
+def read_vertical(files):
+    # Read vertical photo centers. Returns the photo centers read from the
+    # files, the aligned photo centers (PhotoID, Longitude, Latitude, Altitude,
+    # PhotoHeight) and the IDs of the frames not aligned in Metashape.
+    import pandas as pd
+    cols = ['PhotoID', 'X_est', 'Y_est', 'Z_est', 'H_est']
+    ms = read_photo_center_files(files, VERTICAL, cols)
+
+    aligned = ms.X_est.notnull() & ms.Y_est.notnull()
+    centers = ms[aligned]
+    missing = ('AR' + ms.PhotoID[~aligned].str[0:-4]).tolist()
+
+    # Altitude and photo height are kept in single precision, as in the
+    # photo centers feature class the tools used to load
+    pc = pd.DataFrame({'PhotoID': centers.EntityID,
+                       'Longitude': centers.X_est.astype('f8'),
+                       'Latitude': centers.Y_est.astype('f8'),
+                       'Altitude': centers.Z_est.fillna(0).astype('f4'),
+                       'PhotoHeight': centers.H_est.astype('f4')})
+
+    log.info('{0} photo centers loaded...'.format(len(pc)))
+    if missing:
+        log.info('{0} frames missing x, y, or z values'.format(len(missing)))
+        log.debug('missing x, y, or z values for: ' + ', '.join(missing))
+    return ms, pc.reset_index(drop=True), missing
+
+
+def read_oblique(files):
+    # Read oblique photo centers. Returns the photo centers read from the
+    # files and the photo centers (PhotoID, Longitude, Latitude, Direction).
+    import pandas as pd
+    cols = ['PhotoID', 'X_est', 'Y_est', 'Direction']
+    ms = read_photo_center_files(files, OBLIQUE, cols)
+
+    pc = pd.DataFrame({'PhotoID': ms.EntityID,
+                       'Longitude': ms.X_est.astype('f8'),
+                       'Latitude': ms.Y_est.astype('f8'),
+                       'Direction': ms.Direction.fillna('').astype(str)})
+
+    log.info('{0} photo centers loaded...'.format(len(pc)))
+    return ms, pc
+
+
+def report_files(ms, updated):
+    # Report photo frames, aligned frames and updated metadata rows for each
+    # photo centers file
+    import pandas as pd
+    report = pd.DataFrame({
+        'File': ms.File,
+        'aligned': ms.X_est.notnull() & ms.Y_est.notnull(),
+        'updated': ms.EntityID.isin(updated)})
+    for name, rows in report.groupby('File', sort=False):
+        log.info('{0}: {1} frames, {2} aligned, {3} metadata rows updated'.format(
+            name, len(rows), rows.aligned.sum(), rows.updated.sum()))
+
+
+def index_centers(pc, fields):
+    # Index photo centers by photo ID (the first of fields) as tuples of the
+    # values of fields. The last photo center read for an ID is used.
+    centers = {}
+    duplicates = set()
+    for row in zip(*[pc[fld].tolist() for fld in fields]):
+        row = tuple(None if isinstance(v, float) and math.isnan(v) else v
+                    for v in row)
+        if row[0] in centers:
+            duplicates.add(row[0])
+        centers[row[0]] = row
+
+    if duplicates:
+        log.warning('{0} photo IDs have more than one photo center, '
+                    'using the last one read:'.format(len(duplicates)))
+        log.warning(', '.join(sorted(duplicates)))
+    return centers
+
+
+# -------------------------------------------------------------- missing frames
+
+def interpolate_frames(frame_no, values, known, target, method='linear'):
+    # Estimate values at target frame numbers from known frames on a flight
+    # line. Frames between known frames are interpolated ('linear' or cubic
+    # 'spline'), frames beyond the first or last known frame are linearly
+    # extrapolated from the two nearest known frames. Each column is estimated
+    # from the known frames with a value in it (nan if fewer than two).
+    xt = frame_no[target]
+    est = np.full((len(xt), values.shape[1]), np.nan)
+
+    for j in range(values.shape[1]):
+        # Known frames must be unique to interpolate between them
+        has_value = known & ~np.isnan(values[:, j])
+        xk, idx = np.unique(frame_no[has_value], return_index=True)
+        vk = values[has_value, j][idx]
+        if len(xk) < 2:
+            continue
+
+        col = np.interp(xt, xk, vk)
+        if method == 'spline' and len(xk) > 2:
+            from scipy.interpolate import CubicSpline
+            inside = (xt > xk[0]) & (xt < xk[-1])
+            col[inside] = CubicSpline(xk, vk)(xt[inside])
+
+        # Extrapolate first and last end-points along the flight line
+        before = xt < xk[0]
+        col[before] = vk[0] + (xt[before] - xk[0]) * (vk[1] - vk[0]) / (xk[1] - xk[0])
+        after = xt > xk[-1]
+        col[after] = vk[-1] + (xt[after] - xk[-1]) * (vk[-1] - vk[-2]) / (xk[-1] - xk[-2])
+        est[:, j] = col
+
+    return est
+
+
+def estimate_missing(line_rows, pc, missing, method='linear'):
+    # Estimate photo centers of the missing frames from the photo centers pc
+    # of the other frames on their flight lines. line_rows are the values of
+    # LINE_FIELDS of the APSI rows. All flight lines (ROLL_NO, FLIGHT_LINE_NO)
+    # are filled at once, including runs of consecutive missing frames.
+    # Returns the estimated photo centers, with the columns of pc.
+    import pandas as pd
+    est_cols = ['Longitude', 'Latitude', 'Altitude', 'PhotoHeight']
+    frames = pd.DataFrame.from_records(list(line_rows), columns=LINE_FIELDS)
+    frames['PHOTO_FRAME_NO'] = pd.to_numeric(frames.PHOTO_FRAME_NO, errors='coerce')
+
+    # Join photo centers to frames and sort each flight line by frame
+    known_pc = pc[['PhotoID'] + est_cols].drop_duplicates('PhotoID', keep='last')
+    frames = frames.merge(known_pc, how='left', left_on='USGS_ENTITY_ID_NO',
+                          right_on='PhotoID')
+    frames = frames[frames.PHOTO_FRAME_NO.notnull()]
+    frames = frames.sort_values(['ROLL_NO', 'FLIGHT_LINE_NO', 'PHOTO_FRAME_NO'])
+    known = frames.Longitude.notnull() & frames.Latitude.notnull()
+    target = frames.USGS_ENTITY_ID_NO.isin(set(missing)) & ~known
+
+    # Frames without a roll or flight line number are on no flight line
+    no_line = frames.ROLL_NO.isnull() | frames.FLIGHT_LINE_NO.isnull()
+    not_on_line = sorted(frames.USGS_ENTITY_ID_NO[target & no_line])
+    target &= ~no_line
+
+    # Estimate all missing frames one flight line at a time. Altitudes and
+    # photo heights are estimated from the known frames that have them.
+    estimates = []
+    for _, line in frames[(target | known) & ~no_line].groupby(
+            ['ROLL_NO', 'FLIGHT_LINE_NO'], sort=False):
+        line_target = target[line.index].values
+        if not line_target.any():
+            continue
+        est = interpolate_frames(line.PHOTO_FRAME_NO.values.astype(float),
+                                 line[est_cols].values.astype(float),
+                                 known[line.index].values, line_target, method)
+        estimates.append(pd.DataFrame(est, columns=est_cols,
+                                      index=line.index[line_target]))
+
+    if estimates:
+        estimates = pd.concat(estimates)
+        estimates['PhotoID'] = frames.USGS_ENTITY_ID_NO[estimates.index]
+        estimates = estimates[estimates.Longitude.notnull()]
+    else:
+        estimates = pd.DataFrame(columns=['PhotoID'] + est_cols)
+    estimates = estimates.astype({'Altitude': 'f4', 'PhotoHeight': 'f4'})
+
+    not_found = sorted(set(missing) - set(frames.USGS_ENTITY_ID_NO[target])
+                       - set(not_on_line))
+    not_estimated = sorted(set(frames.USGS_ENTITY_ID_NO[target])
+                           - set(estimates.PhotoID))
+    log.info('{0} missing photo centers estimated ({1})'.format(
+        len(estimates), method))
+    if not_found:
+        log.warning('missing frames not in the APSI selection: '
+                    + ', '.join(not_found))
+    if not_on_line:
+        log.warning('missing frames without a roll or flight line number: '
+                    + ', '.join(not_on_line))
+    if not_estimated:
+        log.warning('missing frames on flight lines with fewer than two '
+                    'photo centers: ' + ', '.join(not_estimated))
+
+    return estimates[list(pc.columns)].reset_index(drop=True)
+
+
+# ------------------------------------------------------------------- metadata
+
+def is_missing(value):
+    # True for a null (None) or NaN value
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def estimate_scale(photo_height, focal_length):
+    # Photo scale S = fl/pH from the focal length (fl, mm) and photo height
+    # (pH, m), as a denominator e.g. 1:20000 = 20000. None if the photo height
+    # or the focal length is missing or 0.
+    if is_missing(photo_height) or is_missing(focal_length):
+        return None
+    if not photo_height or not float(focal_length):
+        return None
+    return int((photo_height*39.36)/float(focal_length))
+
+
+def update_vertical_row(urow, srow, scale=True):
+    # Copy a vertical photo center to a metadata row (VERTICAL_FIELDS),
+    # estimating the photo scale where it is missing if scale is True
+    urow[1] = srow[1]
+    urow[2] = srow[2]
+    if scale and (urow[3] is None or urow[3] == 0):
+        estimate = estimate_scale(srow[3], urow[4])
+        if estimate is None:
+            log.warning('cannot estimate the scale of {0}: photo height {1}, '
+                        'focal length {2}'.format(urow[0], srow[3], urow[4]))
+            return
+        urow[3] = estimate
+        log.debug('estimated scale for {0}: {1}'.format(urow[0], urow[3]))
+
+
+def update_oblique_row(urow, srow):
+    # Copy an oblique photo center to a metadata row (OBLIQUE_FIELDS)
+    urow[1] = srow[1]
+    urow[2] = srow[2]
+    if srow[3]:
+        urow[3] = srow[3]
+
+
+def join_centers(rows, centers, update_row):
+    # Update rows ([OID, photo ID, ...] lists of APSI values) in place from
+    # the photo centers with their photo ID. update_row(urow, srow) copies
+    # values from a photo center to the values of a row (without the OID).
+    # Returns the photo IDs of the rows updated and of the rows without a
+    # photo center.
+    matched = set()
+    unmatched = []
+    progress = Progress(log, 'joining photo centers', total=len(rows))
+    for row in rows:
+        progress.update()
+        srow = centers.get(row[1])
+        if srow is None:
+            unmatched.append(row[1])
+            continue
+        urow = row[1:]
+        update_row(urow, srow)
+        row[1:] = urow
+        matched.add(row[1])
+    progress.done()
+    return matched, unmatched
+
+
+def report_join(centers, matched, unmatched):
+    # Report metadata rows updated, metadata rows without a photo center and
+    # photo centers without a metadata row. Returns the latter.
+    unused = sorted(set(centers) - set(matched))
+    msg = ('{0} metadata rows updated, {1} metadata rows without a photo center, '
+           '{2} photo centers without a metadata row').format(
+               len(matched), len(unmatched), len(unused))
+    log.info(msg)
+    count('rows_updated', len(matched))
+    count('rows_without_center', len(unmatched))
+    count('centers_without_row', len(unused))
+    if unmatched:
+        log.warning('no photo center for: ' + ', '.join(map(str, unmatched)))
+    if unused:
+        log.warning('no metadata row for: ' + ', '.join(map(str, unused)))
+    return unused
+
+
+# --------------------------------------------------------------- photo corners
+
+def frame_arrays(cols, values):
+    # Build the table of arrays used by corner_photo from the OIDs and the
+    # values of each column in cols, given as a list of columns.
+    if not values:
+        values = [()]*(len(cols)+1)
+
+    frames = {'oid': np.asarray(values[0], dtype=np.int64)}
+    for col, vals in zip(cols, values[1:]):
+        if col in ('lon', 'lat', 'scale'):
+            frames[col] = np.array(vals, dtype=float)
+        else:
+            frames[col] = np.array(vals, dtype=object)
+    return frames
+
+
+def same_corners(old, new, tol=1e-9):
+    # True if each old corner value is within tol of new, or both are
+    # missing (None or NaN)
+    if old is None:
+        return False
+    for a, b in zip(old, new):
+        if is_missing(a) or is_missing(b):
+            if not (is_missing(a) and is_missing(b)):
+                return False
+        elif abs(a-b) > tol:
+            return False
+    return True
+
+
+def partition_photos(keys):
+    # Sort the photos once on their group keys. Returns the sorted order of
+    # the photos, the key of each group and the start of each group in the
+    # sorted order (plus the end of the last). Photos keep their input order
+    # within a group. None sorts ahead of values.
+    order = sorted(range(len(keys)), key=lambda k: [(v is not None, v) for v in keys[k]])
+    group_keys = []
+    bounds = []
+    for pos, k in enumerate(order):
+        if pos == 0 or keys[k] != group_keys[-1]:
+            group_keys.append(keys[k])
+            bounds.append(pos)
+    bounds.append(len(order))
+    return [np.asarray(order, dtype=np.int64), group_keys, bounds]
+
+
+def processes_from_factor(factor, cores=None):
+    # Number of processes from a parallel processing factor, given as a
+    # number of processes or a percentage of the cores. Unset is 1.
+    factor = str(factor or '').strip()
+    cores = cores or os.cpu_count() or 1
+    try:
+        if factor.endswith('%'):
+            processes = int(round(cores*float(factor[:-1])/100.0))
+        else:
+            processes = int(float(factor)) if factor else 1
+    except ValueError:
+        log.warning(' Invalid parallel processing factor: %s' % factor)
+        processes = 1
+    return max(1, min(processes, cores))
+
+
+def corner_photo(frames, order, bounds, processes=1):
+    # frames is a table of photo center arrays, order lists the photos of one
+    # or more flight lines, each flight line a contiguous run of order starting
+    # at bounds[k] and ending at bounds[k+1].
+    # With more than one process the flight lines are split into chunks that
+    # are computed in a process pool and gathered in order.
+    with stage('corner_photo', rows=len(order)):
+        return _corner_photo(frames, order, bounds, processes)
+
+
+def _corner_photo(frames, order, bounds, processes):
+    lon = frames['lon'][order]
+    lat = frames['lat'][order]
+    scale = frames['scale'][order]
+    exp_num = frames['exposure'][order]
+    if processes < 2 or len(bounds) < 3:
+        [sorted_idx, coord_pt, corner_cols] = corner_kernel(lon, lat, scale, exp_num, bounds)
+        return [order[sorted_idx], coord_pt.reshape(-1, 2).tolist(), corner_cols]
+
+    # Split flight lines into chunks of about the same number of photos
+    bounds = np.asarray(bounds)
+    n_chunks = min(4*processes, len(bounds)-1)
+    cuts = np.unique(bounds[np.searchsorted(bounds, np.linspace(0, bounds[-1], n_chunks+1))])
+    chunks = []
+    for lo, hi in zip(cuts[:-1], cuts[1:]):
+        sub = bounds[(bounds >= lo) & (bounds <= hi)]-lo
+        chunks.append((lo, lon[lo:hi], lat[lo:hi], scale[lo:hi], exp_num[lo:hi], sub))
+
+    log.info(' Computing corners in %s processes' % processes)
+    set_worker_executable()
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(corner_chunk, chunks))
+
+    sorted_idx = np.concatenate([chunk[0]+res[0] for chunk, res in zip(chunks, results)])
+    coord_pt = np.concatenate([res[1] for res in results])
+    corner_cols = np.concatenate([res[2] for res in results])
+    return [order[sorted_idx], coord_pt.reshape(-1, 2).tolist(), corner_cols]
+
+
+def set_worker_executable():
+    # Worker processes must run python rather than the ArcGIS Pro executable
+    if os.path.basename(sys.executable).lower().startswith('arcgispro'):
+        import multiprocessing
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+
+
+def corner_chunk(chunk):
+    # Worker for the parallel mode of corner_photo
+    return corner_kernel(*chunk[1:])
+
+
+def corner_kernel(lon, lat, scale, exp_num, bounds):
+    # Compute the 4 corners of every photo from arrays of photo center lon/lat
+    # (degrees), scale and exposure number. Photos are grouped into flight lines
+    # by bounds (start of each group and end of the last) and sorted by exposure
+    # number within each flight line.
+    # Returns the sorted order of the input photos, the corners (n, 4, 2) in
+    # sorted order and the UR_X, UR_Y, UL_X, UL_Y, LL_X, LL_Y, LR_X, LR_Y columns.
+    bounds = np.asarray(bounds)
+    n = bounds[-1]
+    sizes = np.diff(bounds)
+    group = np.repeat(np.arange(len(sizes)), sizes)
+
+    # sort by exposure number within each flight line (stable, as sorted())
+    order = np.argsort(np.asarray(exp_num, dtype=object), kind='stable')
+    order = order[np.argsort(group[order], kind='stable')]
+
+    x1 = np.radians(np.asarray(lon, dtype=float)[order])
+    y1 = np.radians(np.asarray(lat, dtype=float)[order])
+    scale = np.asarray(scale, dtype=float)[order]
+
+    # Dealing with 9" by 9" photos
+    width_photo = (9*2.54*scale)/100.0
+    # converted the arc length located on the assigned latitude
+    arc_lat = 111132.92-559.82*np.cos(2*y1)+1.175*np.cos(4*y1)
+    rad_photo = np.radians((width_photo/arc_lat)/2.0)  # half of photo width
+    rad_photoS = np.sqrt(2)*rad_photo  # slant of (photo width/2)
+
+    # Flight direction from each photo to the next one on the flight line
+    thetaFlt = np.zeros(n)
+    if n > 1:
+        thetaFlt[:-1] = np.arctan2(y1[:-1]-y1[1:], x1[:-1]-x1[1:])
+    # For the last point of each flight line use the previous direction,
+    # "one point only" flight lines have a flight direction of 0
+    last = bounds[1:][sizes > 0]-1
+    single = sizes[sizes > 0] == 1
+    thetaFlt[last[~single]] = thetaFlt[last[~single]-1]
+    thetaFlt[last[single]] = 0
+
+    # computed 4 corner points
+    ang = thetaFlt[:, None]+math.pi/4.0+np.array([0, math.pi/2.0, math.pi, 1.5*math.pi])
+    corners = np.empty((n, 4, 2))
+    corners[:, :, 0] = np.degrees(x1[:, None]+rad_photoS[:, None]*np.cos(ang))
+    corners[:, :, 1] = np.degrees(y1[:, None]+rad_photoS[:, None]*np.sin(ang))
+
+    # arrange the sequence of corner points following the order of
+    # UR_X, UR_Y, UL_X, UL_Y, LL_X, LL_Y, LR_X, and LR_Y
+    ang_qt = thetaFlt+math.pi/4.0
+    first = np.select(
+        [(ang_qt >= 0.0) & (ang_qt < (math.pi/2.0)),
+         ((ang_qt >= (math.pi/2.0)) & (ang_qt < math.pi)) | ((ang_qt >= (-1.5*math.pi)) & (ang_qt < (-1.0*math.pi))),
+         ((ang_qt >= (-1.0*math.pi)) & (ang_qt < (-1.0*(math.pi/2.0)))) | ((ang_qt >= math.pi) & (ang_qt < 1.5*math.pi))],
+        [0, 3, 2], 1)
+    corner_idx = (first[:, None]+np.arange(4)) % 4
+    ordered = corners[np.arange(n)[:, None], corner_idx].reshape(n, 8)
+
+    return [order, corners, ordered]
+
+
+def corner_rows(rows, fields, processes=1):
+    # Compute the corners of the photos of rows ([OID]+values of fields, with
+    # all of FRAME_FIELDS in fields). Returns {OID: CORNER_FIELDS values}, with
+    # None for corners that cannot be computed.
+    pos = dict((fld, i+1) for i, fld in enumerate(fields))
+    cols = list(FRAME_FIELDS)
+    values = [[row[0] for row in rows]] + \
+             [[row[pos[FRAME_FIELDS[col]]] for row in rows] for col in cols]
+    frames = frame_arrays(cols, values if rows else [])
+
+    # Each (project, roll, flight line) group is a flight line of photos
+    keys = list(zip(frames['project'], frames['roll'], frames['flight']))
+    [order, group_keys, bounds] = partition_photos(keys)
+    log.info(' Number of flight lines: %s' % len(group_keys))
+    [photo_idx, coord_photo, corner_cols] = corner_photo(frames, order, bounds, processes)
+
+    corners = {}
+    for oid, cols in zip(frames['oid'][photo_idx].tolist(), corner_cols.tolist()):
+        corners[oid] = [None if math.isnan(v) else v for v in cols]
+    return corners
+
+
+# -------------------------------------------------------------------- pipeline
+
+def update_photos(storage, update_fields, centers, update_row, processes=1):
+    # Join photo centers to the APSI rows of storage and compute their
+    # corners in one pass. Only rows whose update_fields or corners change are
+    # returned, as {OID: values of update_fields + CORNER_FIELDS}, with the
+    # photo IDs of the rows updated and of the rows without a photo center.
+    # With centers None (and no update_fields) only the corners are computed.
+    nu = len(update_fields)
+    fields = update_fields + [fld for fld in FRAME_FIELDS.values()
+                              if fld not in update_fields]
+    with stage('read') as s:
+        rows = storage.read(fields + CORNER_FIELDS)
+        s.rows = len(rows)
+    old = dict((row[0], row[1:nu+1] + row[len(fields)+1:]) for row in rows)
+    rows = [row[:len(fields)+1] for row in rows]
+
+    matched, unmatched = set(), []
+    if centers is not None:
+        with stage('join', rows=len(rows)):
+            matched, unmatched = join_centers(rows, centers, update_row)
+    with stage('corners', rows=len(rows)):
+        corners = corner_rows(rows, fields, processes)
+
+    changes = {}
+    with stage('compare', rows=len(rows)):
+        for row in rows:
+            oid = row[0]
+            new = corners[oid]
+            if not same_corners(old[oid][nu:], new) or row[1:nu+1] != old[oid][:nu]:
+                changes[oid] = row[1:nu+1] + new
+    count('rows_changed', len(changes))
+    log.info(' Rows with changed centers or corners: %s of %s' % (len(changes), len(rows)))
+    return changes, matched, unmatched
+
+
+def load_centers(files, storage, oblique=False, estimate=False,
+                 method='linear'):
+    # Read photo centers from the Metashape files, estimating the missing
+    # frames of vertical photos from the APSI rows of storage if estimate is
+    # True. Returns the photo centers read from the files and the photo
+    # centers indexed by photo ID.
+    import pandas as pd
+    count('files', len(files))
+    if oblique:
+        with stage('parse') as s:
+            ms, pc = read_oblique(files)
+            s.rows = len(ms)
+        with stage('index', rows=len(pc)):
+            return ms, index_centers(pc, OBLIQUE_FIELDS[1])
+
+    with stage('parse') as s:
+        ms, pc, missing = read_vertical(files)
+        s.rows = len(ms)
+    count('frames_missing', len(missing))
+    if estimate:
+        log.info('estimating missing photo centers...')
+        with stage('estimate', rows=len(missing)):
+            line_rows = [row[1:] for row in storage.read(LINE_FIELDS)]
+            estimates = estimate_missing(line_rows, pc, missing, method)
+            pc = pd.concat([pc, estimates], ignore_index=True)
+    with stage('index', rows=len(pc)):
+        return ms, index_centers(pc, VERTICAL_FIELDS[1])
+
+
+def main(argv=None):
+    # Import photo centers and compute photo corners on a local (GeoPackage
+    # or SQLite) copy of the APSI table
+    import argparse
+    from akapi_storage import SQLiteStorage, write_deltas
+
+    parser = argparse.ArgumentParser(
+        description='Import Metashape photo centers and compute photo corners '
+                    'on a GeoPackage or SQLite copy of the APSI table.')
+    parser.add_argument('photo_centers', help='photo centers file(s) or folder(s), separated by ;')
+    parser.add_argument('database', help='GeoPackage or SQLite file')
+    parser.add_argument('table', help='APSI table')
+    parser.add_argument('where', nargs='?', default='', help='SQL selection of the APSI rows')
+    parser.add_argument('--oblique', action='store_true')
+    parser.add_argument('--no-scale', action='store_true', help='do not estimate missing photo scales')
+    parser.add_argument('--missing-frames', action='store_true', help='estimate missing frames')
+    parser.add_argument('--method', default='linear', choices=['linear', 'spline'])
+    parser.add_argument('--processes', default='1', help='number of processes or percentage of the cores')
+    parser.add_argument('--deltas', help='also write the changed rows to this JSON file, '
+                                         'to be applied to the APSI source with akapi_storage.py')
+    parser.add_argument('--report', help='write the run report to this JSON file '
+                                         '(default next to the database)')
+    args = parser.parse_args(argv)
+
+    with start_run('core', vars(args), args.report or report_path(args.database, 'core')):
+        storage = SQLiteStorage(args.database, args.table, args.where)
+        files = list_photo_center_files(args.photo_centers)
+        ms, centers = load_centers(files, storage, args.oblique,
+                                   args.missing_frames, args.method)
+        if args.oblique:
+            update_fields = OBLIQUE_FIELDS[0]
+            update_row = update_oblique_row
+        else:
+            update_fields = VERTICAL_FIELDS[0]
+            scale = not args.no_scale
+
+            def update_row(urow, srow):
+                update_vertical_row(urow, srow, scale)
+
+        changes, matched, unmatched = update_photos(
+            storage, update_fields, centers, update_row,
+            processes_from_factor(args.processes))
+        report_join(centers, matched, unmatched)
+        report_files(ms, matched)
+        storage.update(update_fields + CORNER_FIELDS, changes)
+
+        if args.deltas:
+            # Deltas are keyed by photo ID, as OIDs differ between copies
+            fields = update_fields + CORNER_FIELDS
+            write_deltas(args.deltas, fields[0], fields[1:],
+                         dict((values[0], values[1:]) for values in changes.values()))
+
+
+if __name__ == '__main__':
+    main()
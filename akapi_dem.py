@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API DEM Sampling
+#
+#   Ground heights sampled from a digital elevation model (DEM) GeoTIFF, e.g.
+#   the DEM of a Metashape chunk. Only the window of the raster around the
+#   points is read, and windows are kept in memory so the DEM is read once
+#   for several exports. Heights are interpolated bilinearly at all points at
+#   once; cells with no data are left out of the interpolation, so a point
+#   has no height only when none of its 4 cells has data.
+#
+#   The DEM is read with GDAL when it is installed (it is in the ArcGIS Pro
+#   Python environment). Otherwise single band GeoTIFFs, uncompressed or
+#   compressed with Deflate, in strips or tiles, are read with numpy.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import collections
+import math
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from akapi_log import get_logger
+
+log = get_logger('dem')
+
+# Cells read around the points
+DEM_MARGIN = 2
+
+# Windows kept in memory
+CACHE_WINDOWS = 4
+
+# Windows by DEM file, most recently used last
+_cache = collections.OrderedDict()
+
+
+class Dem(object):
+    # Elevations of a window of a raster: values (rows x columns, NaN for no
+    # data), the position x0, y0 of the center of the upper left cell and
+    # the cell size dx, dy (dy is negative for north up rasters), in the
+    # coordinate system crs (WKT, or None if unknown)
+
+    def __init__(self, values, x0, y0, dx, dy, crs=None):
+        self.values = values
+        self.x0 = x0
+        self.y0 = y0
+        self.dx = dx
+        self.dy = dy
+        self.crs = crs
+
+    def contains(self, bounds):
+        # True if the window covers bounds (xmin, ymin, xmax, ymax), with
+        # the cells around them
+        rows, cols = self.values.shape
+        x1 = self.x0 + (cols - 1) * self.dx
+        y1 = self.y0 + (rows - 1) * self.dy
+        xmin, ymin, xmax, ymax = bounds
+        return (min(self.x0, x1) + abs(self.dx) <= xmin and xmax <= max(self.x0, x1) - abs(self.dx)
+                and min(self.y0, y1) + abs(self.dy) <= ymin and ymax <= max(self.y0, y1) - abs(self.dy))
+
+    def sample(self, x, y):
+        # Elevations at the points x, y (arrays), interpolated bilinearly
+        # from the cells with data; NaN outside of the window or with no data
+        col = (np.asarray(x, dtype=float) - self.x0) / self.dx
+        row = (np.asarray(y, dtype=float) - self.y0) / self.dy
+        c0 = np.floor(col)
+        r0 = np.floor(row)
+        fc = col - c0
+        fr = row - r0
+        rows, cols = self.values.shape
+        total = np.zeros(col.shape)
+        weights = np.zeros(col.shape)
+        for dr, dc, w in ((0, 0, (1 - fr) * (1 - fc)), (0, 1, (1 - fr) * fc),
+                          (1, 0, fr * (1 - fc)), (1, 1, fr * fc)):
+            r = r0 + dr
+            c = c0 + dc
+            inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+            values = np.full(col.shape, np.nan)
+            values[inside] = self.values[r[inside].astype(np.intp),
+                                         c[inside].astype(np.intp)]
+            valid = ~np.isnan(values) & (w > 0)
+            total[valid] += w[valid] * values[valid]
+            weights[valid] += w[valid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(weights > 0, total / weights, np.nan)
+
+
+def bounds_of(x, y):
+    # Bounds (xmin, ymin, xmax, ymax) of the points x, y, ignoring NaN
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    if not ok.any():
+        return None
+    return (float(x[ok].min()), float(y[ok].min()),
+            float(x[ok].max()), float(y[ok].max()))
+
+
+def read_dem(path, bounds, margin=DEM_MARGIN):
+    # The window of the DEM GeoTIFF path covering bounds (xmin, ymin, xmax,
+    # ymax, in the coordinate system of the DEM) and margin cells around
+    # them. Windows are cached until the file changes.
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    dem = _cache.get(key)
+    if dem is not None and dem.contains(bounds):
+        _cache.move_to_end(key)
+        log.debug('DEM window of {0} from the cache'.format(path))
+        return dem
+
+    try:
+        from osgeo import gdal
+    except ImportError:
+        gdal = None
+    if gdal is not None:
+        dem = _read_gdal(gdal, path, bounds, margin)
+    else:
+        dem = _read_tiff(path, bounds, margin)
+    log.debug('DEM window of {0}: {1} x {2} cells'.format(
+        path, dem.values.shape[1], dem.values.shape[0]))
+
+    _cache[key] = dem
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_WINDOWS:
+        _cache.popitem(last=False)
+    return dem
+
+
+def _window(width, height, x0, y0, dx, dy, bounds, margin):
+    # Cells (first column, first row, columns, rows) of a raster covering
+    # bounds and margin cells around them
+    xmin, ymin, xmax, ymax = bounds
+    cols = sorted(((xmin - x0) / dx, (xmax - x0) / dx))
+    rows = sorted(((ymin - y0) / dy, (ymax - y0) / dy))
+    c0 = min(max(int(math.floor(cols[0])) - margin, 0), width)
+    c1 = min(max(int(math.ceil(cols[1])) + margin + 1, 0), width)
+    r0 = min(max(int(math.floor(rows[0])) - margin, 0), height)
+    r1 = min(max(int(math.ceil(rows[1])) + margin + 1, 0), height)
+    return c0, r0, c1 - c0, r1 - r0
+
+
+def _no_data(values, nodata):
+    values = values.astype(float)
+    if nodata is not None:
+        values[values == nodata] = np.nan
+    return values
+
+
+def _read_gdal(gdal, path, bounds, margin):
+    ds = gdal.Open(path)
+    if ds is None:
+        raise IOError('Cannot open the DEM {0}'.format(path))
+    left, dx, rx, top, ry, dy = ds.GetGeoTransform()
+    if rx or ry:
+        raise ValueError('Rotated DEMs are not supported: {0}'.format(path))
+    x0 = left + dx / 2.0
+    y0 = top + dy / 2.0
+    c0, r0, cols, rows = _window(ds.RasterXSize, ds.RasterYSize, x0, y0, dx, dy,
+                                 bounds, margin)
+    band = ds.GetRasterBand(1)
+    if cols and rows:
+        values = band.ReadAsArray(c0, r0, cols, rows)
+    else:
+        values = np.zeros((rows, cols))
+    return Dem(_no_data(values, band.GetNoDataValue()), x0 + c0 * dx,
+               y0 + r0 * dy, dx, dy, ds.GetProjection() or None)
+
+
+# TIFF field types: struct format and size
+_TYPES = {1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('I', 4), 5: ('II', 8),
+          6: ('b', 1), 7: ('B', 1), 8: ('h', 2), 9: ('i', 4), 10: ('ii', 8),
+          11: ('f', 4), 12: ('d', 8), 16: ('Q', 8), 17: ('q', 8), 18: ('Q', 8)}
+
+# Sample formats: unsigned, signed, floating point
+_KINDS = {1: 'u', 2: 'i', 3: 'f'}
+
+
+def _read_tags(f):
+    # Tags of the first image of the TIFF file f and its byte order
+    order = {b'II': '<', b'MM': '>'}[f.read(2)]
+    version, = struct.unpack(order + 'H', f.read(2))
+    if version == 43:
+        # BigTIFF
+        f.read(4)
+        offset, = struct.unpack(order + 'Q', f.read(8))
+        count_fmt, entry_fmt, inline = 'Q', 'HHQ', 8
+    elif version == 42:
+        offset, = struct.unpack(order + 'I', f.read(4))
+        count_fmt, entry_fmt, inline = 'H', 'HHI', 4
+    else:
+        raise ValueError('Not a TIFF file')
+
+    f.seek(offset)
+    n, = struct.unpack(order + count_fmt, f.read(struct.calcsize(order + count_fmt)))
+    entries = []
+    for _ in range(n):
+        tag, typ, count = struct.unpack(order + entry_fmt,
+                                        f.read(struct.calcsize(order + entry_fmt)))
+        entries.append((tag, typ, count, f.read(inline)))
+
+    tags = {}
+    for tag, typ, count, value in entries:
+        if typ not in _TYPES:
+            continue
+        fmt, size = _TYPES[typ]
+        if size * count > inline:
+            where, = struct.unpack(order + ('Q' if inline == 8 else 'I'), value)
+            f.seek(where)
+            value = f.read(size * count)
+        else:
+            value = value[:size * count]
+        if typ == 2:
+            tags[tag] = value.rstrip(b'\0').decode('ascii', 'replace')
+        else:
+            tags[tag] = struct.unpack(order + fmt[0] * (count * len(fmt)), value)
+    return tags, order
+
+
+def _unpredict(data, predictor, dtype, width):
+    # Undo the TIFF predictor of the rows (of width samples) of a strip or tile
+    if predictor == 2:
+        values = np.frombuffer(data, dtype).reshape(-1, width)
+        return np.cumsum(values, axis=1, dtype=values.dtype)
+    if predictor == 3:
+        # Floating point predictor: the bytes of each row are differenced
+        # and stored most significant byte first
+        size = dtype.itemsize
+        rows = np.frombuffer(data, np.uint8).reshape(-1, width * size)
+        rows = np.cumsum(rows, axis=1, dtype=np.uint8)
+        rows = rows.reshape(-1, size, width).transpose(0, 2, 1)
+        return np.ascontiguousarray(rows).view(dtype.newbyteorder('>')).reshape(-1, width)
+    return np.frombuffer(data, dtype).reshape(-1, width)
+
+
+def _read_tiff(path, bounds, margin):
+    with open(path, 'rb') as f:
+        tags, order = _read_tags(f)
+        width, height = tags[256][0], tags[257][0]
+        if tags.get(277, (1,))[0] != 1:
+            raise ValueError('Only single band DEMs are supported without GDAL: {0}'.format(path))
+        compression = tags.get(259, (1,))[0]
+        if compression not in (1, 8, 32946):
+            raise ValueError('Only uncompressed or Deflate DEMs are supported '
+                             'without GDAL: {0}'.format(path))
+        bits = tags.get(258, (8,))[0]
+        dtype = np.dtype('{0}{1}{2}'.format(order, _KINDS[tags.get(339, (1,))[0]], bits // 8))
+        predictor = tags.get(317, (1,))[0]
+
+        # Georeferencing: pixel scale and tie point, or transformation matrix
+        if 33550 in tags and 33922 in tags:
+            sx, sy = tags[33550][:2]
+            i, j, _, x, y = tags[33922][:5]
+            left, dx, top, dy = x - i * sx, sx, y + j * sy, -sy
+        elif 34264 in tags:
+            m = tags[34264]
+            if m[1] or m[4]:
+                raise ValueError('Rotated DEMs are not supported: {0}'.format(path))
+            left, dx, top, dy = m[3], m[0], m[7], m[5]
+        else:
+            raise ValueError('The DEM is not georeferenced: {0}'.format(path))
+        # Raster type PixelIsPoint: the tie point is the center of the cell
+        keys = tags.get(34735, ())
+        point = any(keys[k:k + 4][0] == 1025 and keys[k + 3] == 2
+                    for k in range(4, len(keys) - 3, 4))
+        x0 = left if point else left + dx / 2.0
+        y0 = top if point else top + dy / 2.0
+        nodata = tags.get(42113)
+        nodata = float(nodata) if nodata not in (None, '') else None
+
+        c0, r0, cols, rows = _window(width, height, x0, y0, dx, dy, bounds, margin)
+        values = np.zeros((rows, cols), dtype)
+        if 322 in tags:
+            bw, bh = tags[322][0], tags[323][0]
+            offsets, counts = tags[324], tags[325]
+        else:
+            bw, bh = width, tags.get(278, (height,))[0]
+            offsets, counts = tags[273], tags[279]
+        across = (width + bw - 1) // bw
+
+        # Read the strips or tiles of the window only
+        for br in range(r0 // bh, (r0 + rows + bh - 1) // bh if rows else 0):
+            for bc in range(c0 // bw, (c0 + cols + bw - 1) // bw if cols else 0):
+                index = br * across + bc
+                f.seek(offsets[index])
+                data = f.read(counts[index])
+                if compression != 1:
+                    data = zlib.decompress(data)
+                block = _unpredict(data, predictor, dtype, bw)
+                # Cells of the block in the window
+                top_row, left_col = br * bh, bc * bw
+                ra, rb = max(r0, top_row), min(r0 + rows, top_row + block.shape[0])
+                ca, cb = max(c0, left_col), min(c0 + cols, left_col + bw)
+                values[ra - r0:rb - r0, ca - c0:cb - c0] = \
+                    block[ra - top_row:rb - top_row, ca - left_col:cb - left_col]
+
+    return Dem(_no_data(values, nodata), x0 + c0 * dx, y0 + r0 * dy, dx, dy)
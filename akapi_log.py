@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Logging
+#
+#   Shared logging for the AK API tools. Messages go to the console and, when
+#   arcpy is available, to the geoprocessing messages with the matching
+#   severity. Per-row detail is logged at DEBUG level and is only shown in
+#   debug mode (set AKAPI_DEBUG=1 or call set_debug()); long loops report
+#   periodic progress summaries instead. arcpy is not imported here: messages
+#   go to the geoprocessing messages once the tool has imported it.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import logging
+import os
+import sys
+import time
+
+LOGGER_NAME = 'akapi'
+
+# Seconds between progress summaries
+PROGRESS_INTERVAL = 5.0
+
+
+class ArcpyHandler(logging.Handler):
+    # Send log records to the geoprocessing messages, if arcpy is loaded
+
+    def emit(self, record):
+        arcpy = sys.modules.get('arcpy')
+        if arcpy is None:
+            return
+        try:
+            msg = self.format(record)
+            if record.levelno >= logging.ERROR:
+                arcpy.AddError(msg)
+            elif record.levelno >= logging.WARNING:
+                arcpy.AddWarning(msg)
+            else:
+                arcpy.AddMessage(msg)
+        except Exception:
+            self.handleError(record)
+
+
+def get_logger(name=None):
+    # Return the AK API logger (or a child logger of it for name), setting up
+    # the console and geoprocessing handlers the first time
+    log = logging.getLogger(LOGGER_NAME)
+    if not log.handlers:
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(console)
+        log.addHandler(ArcpyHandler())
+        log.propagate = False
+        set_debug(os.environ.get('AKAPI_DEBUG', '') not in ('', '0', 'false'))
+    if name:
+        return log.getChild(name)
+    return log
+
+
+class RecordHandler(logging.Handler):
+    # Keep log records in records, with their messages formatted, so that a
+    # worker process can return them to the tool (see replay): messages
+    # sent to the geoprocessing messages by a worker process are lost
+
+    def __init__(self, records):
+        logging.Handler.__init__(self)
+        self.records = records
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def replay(records):
+    # Log the records kept by a RecordHandler in a worker process
+    for record in records:
+        logging.getLogger(record.name).handle(record)
+
+
+def set_debug(debug=True):
+    # Show (True) or hide (False) per-row DEBUG messages
+    logging.getLogger(LOGGER_NAME).setLevel(
+        logging.DEBUG if debug else logging.INFO)
+
+
+class Progress(object):
+    # Count rows processed in a loop and log a summary (rows done, rows/sec
+    # and ETA when the total is known) at most every interval seconds.
+    #
+    #   progress = Progress(log, 'updating metadata', total=len(rows))
+    #   for row in rows:
+    #       ...
+    #       progress.update()
+    #   progress.done()
+
+    def __init__(self, log, label, total=None, interval=None):
+        self.log = log
+        self.label = label
+        self.total = total
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.count = 0
+        self.start = time.time()
+        self.last = self.start
+
+    def update(self, n=1):
+        self.count += n
+        now = time.time()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.log.info(self.summary(now))
+
+    def rate(self, now=None):
+        elapsed = (now or time.time()) - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def summary(self, now=None):
+        rate = self.rate(now)
+        if self.total:
+            msg = '{0}: {1}/{2} rows ({3:.0%}), {4:.0f} rows/sec'.format(
+                self.label, self.count, self.total,
+                float(self.count) / self.total, rate)
+            if rate > 0 and self.count < self.total:
+                msg += ', ETA {0:.0f}s'.format((self.total - self.count) / rate)
+            return msg
+        return '{0}: {1} rows, {2:.0f} rows/sec'.format(
+            self.label, self.count, rate)
+
+    def done(self):
+        now = time.time()
+        self.log.info('{0}: {1} rows in {2:.1f}s ({3:.0f} rows/sec)'.format(
+            self.label, self.count, now - self.start, self.rate(now)))
+        return self.count
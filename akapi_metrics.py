@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Run Metrics
+#
+#   Stage timers and row counters of an AK API tool run. A tool starts a run
+#   report, the stages of the tools and of akapi_core are timed with stage()
+#   and the report is written as JSON next to the output of the tool when the
+#   run ends, even if it fails:
+#
+#       with start_run('import', params, report_path(fgdbTmp, 'import')):
+#           with stage('parse') as s:
+#               ...
+#               s.rows = len(pc)
+#
+#   The report lists the seconds, rows and rows/sec of each stage (nested
+#   stages are named parent/child) and the counters of the run. Set
+#   AKAPI_PROFILE=1 to also profile the run with cProfile: the statistics are
+#   saved next to the report (.prof) and the slowest functions are listed in
+#   it. Set AKAPI_REPORT=0 to not write reports. Stages outside of a run
+#   (e.g. when akapi_core is used from a script) are not recorded.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import collections
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+from akapi_log import get_logger
+
+log = get_logger('metrics')
+
+# Functions listed in the report of a profiled run
+PROFILE_TOP = 25
+
+# Report of the current run, see start_run()
+_run = None
+
+
+def _enabled(name, default):
+    value = os.environ.get(name, default)
+    return value not in ('', '0', 'false')
+
+
+class Stage(object):
+    # A timed stage; set rows to the number of rows it processed
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+
+
+class RunReport(object):
+    # Stages and counters of one tool run
+
+    def __init__(self, tool, params=None, path=None, profile=None):
+        self.tool = tool
+        self.params = dict(params or {})
+        self.path = path
+        self.error = None
+        self.started = datetime.datetime.now()
+        self.start = time.perf_counter()
+        self.stages = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self._stack = []
+        self.profiler = None
+        if profile is None:
+            profile = _enabled('AKAPI_PROFILE', '0')
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stage(self, name, rows=None):
+        return _Timer(self, name, rows)
+
+    def count(self, name, n=1):
+        # Add n to the counter name
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _entry(self, name):
+        # Stages are listed in the order they start, stages run more than
+        # once add up
+        return self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0,
+                                             'rows': None})
+
+    def _record(self, stage):
+        entry = self._entry(stage.name)
+        entry['calls'] += 1
+        entry['seconds'] += stage.seconds
+        if stage.rows is not None:
+            entry['rows'] = (entry['rows'] or 0) + stage.rows
+
+    def to_dict(self):
+        seconds = time.perf_counter() - self.start
+        stages = []
+        for name, entry in self.stages.items():
+            rate = None
+            if entry['rows'] is not None and entry['seconds'] > 0:
+                rate = round(entry['rows'] / entry['seconds'], 1)
+            stages.append({'name': name, 'calls': entry['calls'],
+                           'seconds': round(entry['seconds'], 6),
+                           'rows': entry['rows'], 'rows_per_sec': rate})
+        return {'tool': self.tool,
+                'started': self.started.isoformat(timespec='seconds'),
+                'seconds': round(seconds, 6),
+                'python': platform.python_version(),
+                'platform': sys.platform,
+                'params': self.params,
+                'error': self.error,
+                'stages': stages,
+                'counters': dict(self.counters)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.error = '{0}: {1}'.format(exc_type.__name__, exc)
+        self.write()
+        return False
+
+    def write(self, path=None):
+        # Write the report to path (default the path of the run) and the
+        # profile to path.prof, and end the run. Failures are logged, they do
+        # not fail the tool.
+        global _run
+        if _run is self:
+            _run = None
+        if self.profiler is not None:
+            self.profiler.disable()
+        path = path or self.path
+        if not path:
+            return None
+        report = self.to_dict()
+        try:
+            if self.profiler is not None:
+                prof = os.path.splitext(path)[0] + '.prof'
+                self.profiler.dump_stats(prof)
+                report['profile'] = {'stats': prof,
+                                     'functions': profile_top(self.profiler)}
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=1)
+        except (IOError, OSError) as e:
+            log.warning('Could not write the run report {0}: {1}'.format(path, e))
+            return None
+        log.info('Run report: {0}'.format(path))
+        for entry in report['stages']:
+            log.debug('  {name}: {seconds:.3f}s, {rows} rows'.format(**entry))
+        return path
+
+
+class _Timer(object):
+    # Context manager timing a stage of a report (or of no report)
+
+    def __init__(self, report, name, rows=None):
+        self.report = report
+        self.stage = Stage(name, rows)
+
+    def __enter__(self):
+        if self.report is not None:
+            stack = self.report._stack
+            if stack:
+                self.stage.name = stack[-1].name + '/' + self.stage.name
+            stack.append(self.stage)
+            self.report._entry(self.stage.name)
+        self.start = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.stage.seconds = time.perf_counter() - self.start
+        if self.report is not None:
+            self.report._stack.pop()
+            self.report._record(self.stage)
+        return False
+
+
+def start_run(tool, params=None, path=None, profile=None):
+    # Start the report of a run of tool, with its parameters params, to be
+    # written to path
+    global _run
+    _run = RunReport(tool, params, path, profile)
+    return _run
+
+
+def current_run():
+    return _run
+
+
+def stage(name, rows=None):
+    # Time a stage of the current run:
+    #
+    #   with stage('join', rows=len(rows)):
+    #       ...
+    return _Timer(_run, name, rows)
+
+
+def count(name, n=1):
+    # Add n to a counter of the current run
+    if _run is not None:
+        _run.count(name, n)
+
+
+def report_path(output, tool):
+    # Path of the run report of tool next to output: a file, a folder or a
+    # geodatabase (the report goes in the folder of the geodatabase). None
+    # if reports are disabled (AKAPI_REPORT=0) or output is not on disk.
+    if not _enabled('AKAPI_REPORT', '1') or not output:
+        return None
+    output = output.rstrip('\\/')
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    name = '{0}_run_{1}.json'.format(tool, stamp)
+    ext = os.path.splitext(output)[1].lower()
+    if ext in ('.gdb', '.sde', '.gpkg', '.sqlite'):
+        return os.path.join(os.path.dirname(output), name)
+    if os.path.isdir(output):
+        return os.path.join(output, name)
+    if os.path.isdir(os.path.dirname(output) or '.') and ext:
+        return os.path.splitext(output)[0] + '_run.json'
+    return None
+
+
+def profile_top(profiler, n=PROFILE_TOP):
+    # The n functions with the highest cumulative time of a cProfile run
+    import pstats
+    stats = pstats.Stats(profiler)
+    top = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        top.append({'function': '{0}:{1}({2})'.format(
+                        os.path.basename(func[0]), func[1], func[2]),
+                    'calls': nc, 'total_seconds': round(tt, 6),
+                    'cumulative_seconds': round(ct, 6)})
+    top.sort(key=lambda f: f['cumulative_seconds'], reverse=True)
+    return top[:n]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Tool Parameters
+#
+#   Reading of the optional parameters added to the AK API script tools after
+#   their toolboxes were made. arcpy raises an error when a script asks for a
+#   parameter its tool does not define, so parameters past the end of a tool
+#   (a toolbox that has not been updated in ArcGIS Pro yet, see README.md)
+#   read as their default instead.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+from akapi_log import get_logger
+
+log = get_logger('params')
+
+
+def optional_parameter(index, default=''):
+    # Text of the tool parameter index, or default if it is empty or the tool
+    # does not define it
+    import arcpy
+    if index >= arcpy.GetArgumentCount():
+        return default
+    return arcpy.GetParameterAsText(index) or default
+
+
+def choice_parameter(index, choices, default):
+    # Value of the optional tool parameter index, one of choices
+    value = optional_parameter(index, default).strip().lower()
+    if value not in choices:
+        msg = 'Parameter {0} must be one of {1}, not {2!r}'.format(
+            index, ', '.join(choices), value)
+        log.error(msg)
+        raise ValueError(msg)
+    return value
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Photo Centers Reader
+#
+#   Reads the photo centers files exported from Metashape: the vertical
+#   layout written by export_camera_coords_agl.py (9 columns, with the photo
+#   height H_est and ground height H_ground) and the oblique layout (7
+#   columns, with the Direction of the photo). The layout is detected from
+#   the header of the file, or from the number of columns of its first row,
+#   and the coordinate system line of the header is kept as metadata.
+#
+#   Files are parsed with the multi-threaded pyarrow CSV reader when pyarrow
+#   is installed (it is in the ArcGIS Pro Python environment), with the
+#   pandas C parser otherwise. Very large files can be read in chunks of rows
+#   with iter_chunks(), to bound the memory used by the parser.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import collections
+
+from akapi_log import get_logger
+
+log = get_logger('reader')
+
+VERTICAL = 'vertical'
+OBLIQUE = 'oblique'
+
+# Columns of the photo centers files of each layout
+LAYOUTS = {VERTICAL: ['PhotoID', 'X', 'Y', 'Z', 'X_est', 'Y_est', 'Z_est',
+                      'H_est', 'H_g'],
+           OBLIQUE: ['PhotoID', 'X', 'Y', 'Z', 'X_est', 'Y_est', 'Direction']}
+
+# Header column that only one layout has
+LAYOUT_COLUMNS = {'H_est': VERTICAL, 'H_ground': VERTICAL, 'Direction': OBLIQUE}
+
+CRS_PREFIX = '#CoordinateSystem:'
+
+# Rows per chunk of iter_chunks()
+CHUNK_ROWS = 500000
+
+# Size of the blocks the streaming pyarrow reader parses. The reader reads
+# ahead a few dozen blocks, so its memory grows with the block size.
+STREAM_BLOCK_SIZE = 1 << 20
+
+# Header of a photo centers file: coordinate system (WKT or None), column
+# names of the header (or None), layout (or None if unknown) and number of
+# header lines
+Header = collections.namedtuple('Header', ['crs', 'columns', 'layout', 'lines'])
+
+
+def read_header(path):
+    # Read the header lines (starting with #) of the file path and detect its
+    # layout
+    crs = None
+    columns = None
+    lines = 0
+    first = None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.startswith('#'):
+                first = line
+                break
+            lines += 1
+            if line.startswith(CRS_PREFIX):
+                crs = line[len(CRS_PREFIX):].strip() or None
+            elif '\t' in line:
+                columns = line[1:].split('\t')
+
+    layout = None
+    for name in columns or []:
+        layout = LAYOUT_COLUMNS.get(name.strip(), layout)
+    if layout is None and first:
+        width = len(first.split('\t'))
+        for name, names in LAYOUTS.items():
+            if width == len(names):
+                layout = name
+    return Header(crs, columns, layout, lines)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _arrow_options(pa, header, names, cols, block_size=None):
+    # pyarrow CSV options for the columns cols of a file with the columns
+    # names: PhotoID (and Direction) are text, other columns numbers
+    read = pa.csv.ReadOptions(skip_rows=header.lines, column_names=names,
+                              use_threads=True)
+    if block_size:
+        read.block_size = block_size
+    types = dict((name, pa.string() if name in ('PhotoID', 'Direction')
+                  else pa.float64()) for name in names)
+    convert = pa.csv.ConvertOptions(include_columns=cols, column_types=types,
+                                    strings_can_be_null=True)
+    return read, pa.csv.ParseOptions(delimiter='\t'), convert
+
+
+def _pandas_options(header, names, cols):
+    return dict(sep='\t', skiprows=header.lines, comment='#', header=None,
+                names=names, usecols=cols, dtype={'PhotoID': 'str'})
+
+
+def read_columns(path, layout, cols, header=None):
+    # Read the columns cols of the photo centers file path of the layout
+    # layout into a dataframe
+    import pandas as pd
+    header = header or read_header(path)
+    names = LAYOUTS[layout]
+    pa = _pyarrow()
+    if pa is not None:
+        read, parse, convert = _arrow_options(pa, header, names, cols)
+        return pa.csv.read_csv(path, read_options=read, parse_options=parse,
+                               convert_options=convert).to_pandas()
+    return pd.read_csv(path, **_pandas_options(header, names, cols))
+
+
+def iter_chunks(path, layout, cols, rows=CHUNK_ROWS, header=None):
+    # Read the columns cols of the photo centers file path of the layout
+    # layout as dataframes of at most about rows rows
+    import pandas as pd
+    header = header or read_header(path)
+    names = LAYOUTS[layout]
+    pa = _pyarrow()
+    if pa is not None:
+        # Small blocks, gathered into chunks of about rows rows
+        read, parse, convert = _arrow_options(pa, header, names, cols,
+                                              block_size=STREAM_BLOCK_SIZE)
+        with pa.csv.open_csv(path, read_options=read, parse_options=parse,
+                             convert_options=convert) as reader:
+            batches, size = [], 0
+            for batch in reader:
+                batches.append(batch)
+                size += batch.num_rows
+                if size >= rows:
+                    yield pa.Table.from_batches(batches).to_pandas()
+                    batches, size = [], 0
+            if batches:
+                yield pa.Table.from_batches(batches).to_pandas()
+        return
+    with pd.read_csv(path, chunksize=rows, **_pandas_options(header, names, cols)) as reader:
+        for frame in reader:
+            yield frame
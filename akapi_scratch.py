@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Scratch Data
+#
+#   Location of the intermediate datasets (photo centers, selected frames and
+#   photo corners) created and deleted by the AK API tools. By default they
+#   are kept in the ArcGIS Pro memory workspace, set AKAPI_SCRATCH=disk to
+#   write them to the workspace given to the tool instead. Dataset names get
+#   a suffix unique to the run, so several runs can share a workspace, and
+#   Scratch deletes the datasets of a run even when the run fails.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+import uuid
+
+from akapi_log import get_logger
+
+log = get_logger('scratch')
+
+MEMORY = 'memory'
+
+
+def scratch_workspace(workspace):
+    # Workspace for intermediate datasets: memory, or workspace if
+    # AKAPI_SCRATCH=disk
+    if os.environ.get('AKAPI_SCRATCH', MEMORY).lower() == 'disk':
+        return workspace
+    return MEMORY
+
+
+def scratch_path(workspace, name, run_id):
+    # Path of the intermediate dataset name of the run run_id
+    return os.path.join(scratch_workspace(workspace),
+                        '{0}_{1}'.format(name, run_id))
+
+
+class Scratch(object):
+    # Intermediate datasets of a run, deleted when the with block exits:
+    #
+    #   scratch = Scratch(fgdbTmp)
+    #   with scratch:
+    #       pntTmp = scratch.path('msPhotoCenters')
+    #       ...
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.run_id = uuid.uuid4().hex[:12]
+        self.paths = []
+
+    def path(self, name):
+        # Path of the intermediate dataset name, deleted by cleanup()
+        path = scratch_path(self.workspace, name, self.run_id)
+        if path not in self.paths:
+            self.paths.append(path)
+        return path
+
+    def cleanup(self):
+        import arcpy
+        for path in reversed(self.paths):
+            try:
+                if arcpy.Exists(path):
+                    arcpy.Delete_management(path)
+            except Exception as e:
+                log.warning('Could not delete {0}: {1}'.format(path, e))
+        self.paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+        return False
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Storage
+#
+#   Storage backends for the APSI rows read and written by akapi_core. Both
+#   backends select rows with an SQL where clause and have the same methods:
+#
+#       fields()                              field names of the table
+#       read(fields)                          [[OID, values...], ...]
+#       update(fields, changes)               write {OID: values}
+#       update_by_key(key, fields, changes)   write {key value: values}
+#
+#   ArcpyStorage works on a table or feature class arcpy can open (SDE or file
+#   geodatabase), SQLiteStorage on a table of a GeoPackage or SQLite file and
+#   needs no arcpy. Changes computed on a local copy can be saved with
+#   write_deltas and applied to the APSI source with:
+#
+#       python akapi_storage.py deltas.json <APSI source> [where clause]
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import json
+import sqlite3
+import sys
+
+from akapi_log import get_logger, Progress
+from akapi_metrics import stage
+
+log = get_logger('storage')
+
+
+class ArcpyStorage(object):
+    # APSI rows of an arcpy table selected by the where clause sql
+
+    def __init__(self, table, sql=''):
+        self.table = table
+        self.sql = sql
+
+    def fields(self):
+        import arcpy
+        return [field.name for field in arcpy.ListFields(self.table)]
+
+    def read(self, fields):
+        import arcpy
+        with arcpy.da.SearchCursor(self.table, ['OID@'] + list(fields),
+                                   self.sql or None) as cursor:
+            return [list(row) for row in cursor]
+
+    def update(self, fields, changes, chunk=1000):
+        # Update the rows of changes ({OID: values of fields}). Only those
+        # rows are read again: they are selected by OID (see update_by_key).
+        import arcpy
+        oid_fld = arcpy.Describe(self.table).OIDFieldName
+        return self.update_by_key(oid_fld, fields, changes, chunk)
+
+    def update_by_key(self, key_fld, fields, changes, chunk=1000):
+        # Update the rows matching the keys of changes ({key: values of
+        # fields}). Rows are selected with a where clause on the keys, in
+        # chunks of at most chunk keys, within the sql selection.
+        import arcpy
+        keys = list(changes)
+        key_sql = arcpy.AddFieldDelimiters(self.table, key_fld)
+        progress = Progress(log, ' Updating APSI rows', total=len(keys))
+        with stage('write', rows=len(keys)):
+            for i in range(0, len(keys), chunk):
+                key_list = ','.join(sql_value(key) for key in keys[i:i+chunk])
+                where = '%s IN (%s)' % (key_sql, key_list)
+                if self.sql:
+                    where = '(%s) AND %s' % (self.sql, where)
+                with arcpy.da.UpdateCursor(self.table, [key_fld] + list(fields),
+                                           where) as cursor:
+                    for row in cursor:
+                        cursor.updateRow([row[0]] + list(changes[row[0]]))
+                        progress.update()
+        return progress.done()
+
+
+class SQLiteStorage(object):
+    # APSI rows of a table of a GeoPackage or SQLite file selected by the
+    # where clause sql. The OID is the integer primary key of the table
+    # (fid in a GeoPackage) or the SQLite rowid.
+
+    def __init__(self, path, table, sql=''):
+        self.path = path
+        self.table = table
+        self.sql = sql
+        self.conn = sqlite3.connect(path)
+        info = self.conn.execute('PRAGMA table_info(%s)' % quote(table)).fetchall()
+        if not info:
+            msg = 'No table {0} in {1}'.format(table, path)
+            log.error(msg)
+            raise ValueError(msg)
+        self._fields = [col[1] for col in info]
+        pk = [col[1] for col in info if col[5] and col[2].upper() == 'INTEGER']
+        self.oid = pk[0] if len(pk) == 1 else 'rowid'
+
+    def fields(self):
+        return list(self._fields)
+
+    def _where(self, clause=''):
+        clauses = [c for c in ('(%s)' % self.sql if self.sql else '', clause) if c]
+        return ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+
+    def read(self, fields):
+        cols = ', '.join([quote(self.oid)] + [quote(fld) for fld in fields])
+        cursor = self.conn.execute('SELECT %s FROM %s%s' % (
+            cols, quote(self.table), self._where()))
+        return [list(row) for row in cursor]
+
+    def _update(self, key, fields, changes):
+        sets = ', '.join('%s = ?' % quote(fld) for fld in fields)
+        sql = 'UPDATE %s SET %s%s' % (quote(self.table), sets,
+                                      self._where('%s = ?' % quote(key)))
+        with stage('write', rows=len(changes)), self.conn:
+            count = 0
+            for key_value, values in changes.items():
+                count += self.conn.execute(sql, list(values) + [key_value]).rowcount
+        log.info(' Updated {0} APSI rows'.format(count))
+        return count
+
+    def update(self, fields, changes):
+        # Update the rows of changes ({OID: values of fields})
+        return self._update(self.oid, fields, changes)
+
+    def update_by_key(self, key_fld, fields, changes):
+        # Update the rows matching the keys of changes ({key: values of fields})
+        return self._update(key_fld, fields, changes)
+
+    def close(self):
+        self.conn.close()
+
+
+def quote(name):
+    # Quote an SQLite identifier
+    return '"%s"' % name.replace('"', '""')
+
+
+def sql_value(value):
+    # Format a key value as an SQL literal
+    if isinstance(value, str):
+        return "'%s'" % value.replace("'", "''")
+    return str(value)
+
+
+def write_deltas(path, key_fld, fields, changes):
+    # Save changes ({key: values of fields}) to a JSON file
+    with open(path, 'w') as f:
+        json.dump({'key': key_fld, 'fields': list(fields),
+                   'changes': [[key] + list(values)
+                               for key, values in changes.items()]}, f)
+    log.info('{0} changed rows saved to {1}'.format(len(changes), path))
+
+
+def read_deltas(path):
+    # Read changes saved by write_deltas. Returns the key field, the fields
+    # and the changes.
+    with open(path) as f:
+        deltas = json.load(f)
+    changes = dict((row[0], row[1:]) for row in deltas['changes'])
+    return deltas['key'], deltas['fields'], changes
+
+
+def apply_deltas(path, storage):
+    # Apply changes saved by write_deltas to storage
+    key_fld, fields, changes = read_deltas(path)
+    return storage.update_by_key(key_fld, fields, changes)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit('usage: python akapi_storage.py deltas.json <APSI source> [where clause]')
+    apply_deltas(sys.argv[1], ArcpyStorage(sys.argv[2],
+                                           sys.argv[3] if len(sys.argv) > 3 else ''))
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         arcpy stand-in for the AK API benchmarks
+#
+#   A small in-memory replacement for the parts of arcpy the AK API tools
+#   use: tables and feature classes are lists of rows kept in TABLES by path,
+#   arcpy.da cursors iterate them, and the geoprocessing tools the tools call
+#   work on them. Where clauses support FIELD = value and FIELD IN (...)
+#   joined with AND, which is what the tools and benchmarks use. It is only
+#   meant to time the Python side of the tools, not to reproduce arcpy.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+import re
+
+from . import da
+
+# Tables by path, and tool parameters by index
+TABLES = {}
+PARAMS = {}
+MESSAGES = []
+
+# Number of parameters of the running tool, as defined in its toolbox. Like
+# arcpy, asking for a parameter past the end is an error. None accepts any
+# parameter (unset ones are empty).
+PARAMETER_COUNT = None
+
+
+class _Env(object):
+    def __init__(self):
+        self.overwriteOutput = False
+        self.workspace = ''
+        self.parallelProcessingFactor = None
+
+
+env = _Env()
+
+
+class Table(object):
+    # Rows of a table or feature class. fields are (name, type) pairs, the
+    # first is the OBJECTID and feature classes have a SHAPE field.
+
+    def __init__(self, fields, shape_type=None, spatial_reference=None):
+        self.fields = [('OBJECTID', 'OID')] + [f for f in fields if f[1] != 'OID']
+        self.shape_type = shape_type
+        if shape_type and 'SHAPE' not in self.names():
+            self.fields.insert(1, ('SHAPE', 'Geometry'))
+        self.spatial_reference = spatial_reference
+        self.rows = []
+        self.next_oid = 1
+        self._by_oid = {}
+
+    def names(self):
+        return [f[0] for f in self.fields]
+
+    def index(self, name):
+        upper = name.upper()
+        for i, f in enumerate(self.fields):
+            if f[0].upper() == upper:
+                return i
+        raise RuntimeError('Cannot find field {0}'.format(name))
+
+    def append(self, values):
+        # values are all fields but the OBJECTID
+        self.rows.append([self.next_oid] + list(values))
+        self.next_oid += 1
+
+
+def _path(table):
+    table = str(table)
+    if table in TABLES or os.path.isabs(table) or not env.workspace:
+        return table
+    if table in _VIEWS:
+        return table
+    path = os.path.join(env.workspace, table)
+    return path if path in TABLES else table
+
+
+# Table views: name -> (source path, where clause)
+_VIEWS = {}
+
+
+def _table(table):
+    path = _path(table)
+    if path in _VIEWS:
+        return TABLES[_VIEWS[path][0]]
+    if path not in TABLES:
+        raise RuntimeError('Dataset {0} does not exist'.format(table))
+    return TABLES[path]
+
+
+def _view_where(table, where):
+    # Where clause of a table view and of a cursor on it
+    path = _path(table)
+    if path in _VIEWS and _VIEWS[path][1]:
+        if where:
+            return '({0}) AND {1}'.format(_VIEWS[path][1], where)
+        return _VIEWS[path][1]
+    return where
+
+
+def _literal(text):
+    text = text.strip()
+    if text.startswith("'"):
+        return text[1:-1].replace("''", "'")
+    return float(text) if '.' in text else int(text)
+
+
+def _split(text, sep):
+    # Split text on sep outside quotes and parentheses
+    parts = []
+    depth = 0
+    quoted = False
+    start = 0
+    for m in re.finditer("'|\\(|\\)|" + re.escape(sep), text, re.I):
+        token = m.group(0)
+        if token == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0:
+            parts.append(text[start:m.start()])
+            start = m.end()
+    parts.append(text[start:])
+    return parts
+
+
+def _clauses(where):
+    where = (where or '').strip()
+    while where.startswith('(') and where.endswith(')') and _balanced(where[1:-1]):
+        where = where[1:-1].strip()
+    return _split(where, ' AND ') if where else []
+
+
+def candidate_rows(table, where):
+    # Rows of table a where clause can match: the rows of the OBJECTIDs of an
+    # OBJECTID IN (...) clause, read by OID as a database reads them from its
+    # index, or all rows
+    for clause in _clauses(where):
+        m = re.match(r'^"?OBJECTID"?\s+IN\s*\((.*)\)$', clause.strip(), re.I | re.S)
+        if m:
+            if len(table._by_oid) != len(table.rows):
+                table._by_oid = dict((row[0], row) for row in table.rows)
+            oids = sorted(set(_literal(v) for v in _split(m.group(1), ',')))
+            return [table._by_oid[oid] for oid in oids if oid in table._by_oid]
+    return table.rows
+
+
+def where_filter(table, where):
+    # Predicate on the rows of table for a where clause
+    where = (where or '').strip()
+    while where.startswith('(') and where.endswith(')') and _balanced(where[1:-1]):
+        where = where[1:-1].strip()
+    if not where:
+        return lambda row: True
+
+    clauses = _split(where, ' AND ')
+    if len(clauses) > 1:
+        tests = [where_filter(table, clause) for clause in clauses]
+        return lambda row: all(test(row) for test in tests)
+
+    m = re.match(r'^"?(\w+)"?\s+IN\s*\((.*)\)$', where, re.I | re.S)
+    if m:
+        i = table.index(m.group(1))
+        values = set(_literal(v) for v in _split(m.group(2), ','))
+        return lambda row: row[i] in values
+    m = re.match(r'^"?(\w+)"?\s*=\s*(.+)$', where, re.S)
+    if m:
+        i = table.index(m.group(1))
+        value = _literal(m.group(2))
+        return lambda row: row[i] == value
+    raise NotImplementedError('where clause not supported: ' + where)
+
+
+def _balanced(text):
+    depth = 0
+    for c in text:
+        depth += c == '('
+        depth -= c == ')'
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+# ---------------------------------------------------------------- parameters
+
+def GetArgumentCount():
+    if PARAMETER_COUNT is not None:
+        return PARAMETER_COUNT
+    return max(PARAMS) + 1 if PARAMS else 0
+
+
+def GetParameterAsText(index):
+    if PARAMETER_COUNT is not None and index >= PARAMETER_COUNT:
+        raise RuntimeError('Object: Error in getting parameter as text')
+    return str(PARAMS.get(index, ''))
+
+
+def SetParameterAsText(index, value):
+    if PARAMETER_COUNT is not None and index >= PARAMETER_COUNT:
+        raise RuntimeError('Object: Error in setting parameter as text')
+    PARAMS[index] = value
+
+
+def AddMessage(message):
+    MESSAGES.append(('message', str(message)))
+
+
+def AddWarning(message):
+    MESSAGES.append(('warning', str(message)))
+
+
+def AddError(message):
+    MESSAGES.append(('error', str(message)))
+
+
+# -------------------------------------------------------------------- geometry
+
+class SpatialReference(object):
+    def __init__(self, code=4326):
+        self.factoryCode = code
+
+    def exportToString(self):
+        return "GEOGCS['GCS_WGS_1984',DATUM['D_WGS_1984',SPHEROID['WGS_1984',6378137.0,298.257223563]],PRIMEM['Greenwich',0.0],UNIT['Degree',0.0174532925199433]]"
+
+
+class Point(object):
+    def __init__(self, X=None, Y=None, Z=None):
+        self.X = X
+        self.Y = Y
+        self.Z = Z
+
+
+class Array(list):
+    pass
+
+
+class PointGeometry(object):
+    def __init__(self, point, spatial_reference=None):
+        self.X = point.X
+        self.Y = point.Y
+        self.spatialReference = spatial_reference
+
+
+class Polygon(object):
+    def __init__(self, array, spatial_reference=None):
+        self.points = [(p.X, p.Y) for p in array]
+        self.spatialReference = spatial_reference
+
+
+class _Description(object):
+    def __init__(self, table):
+        self.spatialReference = table.spatial_reference or SpatialReference()
+        self.shapeType = table.shape_type
+        self.OIDFieldName = 'OBJECTID'
+
+
+def Describe(table):
+    return _Description(_table(table))
+
+
+# ----------------------------------------------------------------- data access
+
+class Field(object):
+    def __init__(self, name, type_):
+        self.name = name
+        self.type = type_
+
+
+def ListFields(table):
+    return [Field(name, type_) for name, type_ in _table(table).fields]
+
+
+def AddFieldDelimiters(table, field):
+    return field
+
+
+def Exists(table):
+    path = _path(table)
+    return path in TABLES or path in _VIEWS
+
+
+def Delete_management(table):
+    path = _path(table)
+    TABLES.pop(path, None)
+    _VIEWS.pop(path, None)
+
+
+class _Result(object):
+    def __init__(self, value):
+        self.value = value
+
+    def getOutput(self, index):
+        return self.value
+
+    def __str__(self):
+        return str(self.value)
+
+
+def GetCount_management(table):
+    t = _table(table)
+    test = where_filter(t, _view_where(table, ''))
+    return _Result(str(sum(1 for row in t.rows if test(row))))
+
+
+def MakeTableView_management(table, name, where=''):
+    _VIEWS[name] = (_path(table), _view_where(table, where))
+    return name
+
+
+def XYTableToPoint_management(table, out, x, y, z='', spatial_reference=None):
+    source = _table(table)
+    test = where_filter(source, _view_where(table, ''))
+    fields = [f for f in source.fields if f[1] not in ('OID', 'Geometry')]
+    names = [f[0] for f in fields]
+    xi, yi = source.index(x), source.index(y)
+    columns = [source.index(n) for n in names]
+    out_table = Table(fields, 'Point', spatial_reference)
+    for row in source.rows:
+        if test(row):
+            shape = (row[xi], row[yi]) if row[xi] is not None and row[yi] is not None else None
+            out_table.append([shape] + [row[i] for i in columns])
+    TABLES[_out_path(out)] = out_table
+    return out
+
+
+def _out_path(out):
+    out = str(out)
+    if os.path.isabs(out) or not env.workspace or '/' in out or '\\' in out:
+        return out
+    return os.path.join(env.workspace, out)
+
+
+def CreateFeatureclass_management(workspace, name, geometry_type, template='',
+                                  has_m='DISABLED', has_z='DISABLED',
+                                  spatial_reference=None):
+    fields = []
+    if template:
+        fields = [f for f in _table(template).fields if f[1] not in ('OID', 'Geometry')]
+    path = os.path.join(str(workspace), name)
+    TABLES[path] = Table(fields, geometry_type.title(), spatial_reference)
+    return path
+
+
+def CreateTable_management(workspace, name):
+    path = os.path.join(str(workspace), name)
+    TABLES[path] = Table([])
+    return path
+
+
+def AddField_management(table, name, field_type, *args, **kwargs):
+    t = _table(table)
+    t.fields.append((name, field_type))
+    for row in t.rows:
+        row.append(None)
+
+
+def AddFields_management(table, specs):
+    for spec in specs:
+        AddField_management(table, spec[0], spec[1])
+
+
+def DeleteField_management(table, names):
+    t = _table(table)
+    if isinstance(names, str):
+        names = names.split(';')
+    for name in names:
+        try:
+            i = t.index(name)
+        except RuntimeError:
+            continue
+        t.fields.pop(i)
+        for row in t.rows:
+            row.pop(i)
+
+
+def CopyFeatures_management(geometries, out):
+    out_table = Table([], 'Point')
+    for g in geometries:
+        out_table.append([(g.X, g.Y)])
+    TABLES[_out_path(out)] = out_table
+    return out
+
+
+def DefineProjection_management(table, spatial_reference):
+    _table(table).spatial_reference = spatial_reference
+
+
+def ApplySymbologyFromLayer_management(*args, **kwargs):
+    pass
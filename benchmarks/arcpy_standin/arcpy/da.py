@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# arcpy.da cursors of the AK API benchmark stand-in (see __init__.py)
+
+import arcpy
+
+
+def _columns(table, fields):
+    # Row accessors for the field names and tokens of a cursor
+    columns = []
+    for field in fields:
+        token = field.upper()
+        if token == 'OID@':
+            columns.append(table.index('OBJECTID'))
+        elif token in ('SHAPE@', 'SHAPE@XY'):
+            columns.append(table.index('SHAPE'))
+        elif token in ('SHAPE@X', 'SHAPE@Y'):
+            columns.append((table.index('SHAPE'), 0 if token == 'SHAPE@X' else 1))
+        else:
+            columns.append(table.index(field))
+    return columns
+
+
+def _get(row, column):
+    if isinstance(column, tuple):
+        shape = row[column[0]]
+        return None if shape is None else shape[column[1]]
+    return row[column]
+
+
+class _Cursor(object):
+
+    def __init__(self, table, field_names, where_clause=None, *args, **kwargs):
+        if isinstance(field_names, str):
+            field_names = [field_names]
+        self.table = arcpy._table(table)
+        self.fields = list(field_names)
+        self.columns = _columns(self.table, self.fields)
+        where = arcpy._view_where(table, where_clause)
+        self.test = arcpy.where_filter(self.table, where)
+        self.candidates = arcpy.candidate_rows(self.table, where)
+        self._iter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    # Cursors are iterators, as in arcpy: rows read with next() or
+    # itertools.islice() are not read again until reset()
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iter is None:
+            self._iter = self._values()
+        return next(self._iter)
+
+    next = __next__
+
+    def reset(self):
+        self._iter = None
+
+    def _rows(self):
+        columns = self.columns
+        test = self.test
+        if all(isinstance(c, int) for c in columns):
+            for row in self.candidates:
+                if test(row):
+                    yield row, [row[c] for c in columns]
+            return
+        for row in self.candidates:
+            if test(row):
+                yield row, [_get(row, c) for c in columns]
+
+
+class SearchCursor(_Cursor):
+
+    def _values(self):
+        for _, values in self._rows():
+            yield tuple(values)
+
+
+class UpdateCursor(_Cursor):
+
+    def _values(self):
+        for row, values in self._rows():
+            self._row = row
+            yield values
+
+    def updateRow(self, values):
+        for column, value in zip(self.columns, values):
+            if isinstance(column, tuple):
+                continue
+            if column == 0:
+                continue
+            self._row[column] = value
+
+
+class InsertCursor(_Cursor):
+
+    def __init__(self, table, field_names, *args, **kwargs):
+        _Cursor.__init__(self, table, field_names)
+
+    def insertRow(self, values):
+        row = [None] * len(self.table.fields)
+        for field, column, value in zip(self.fields, self.columns, values):
+            if field.upper() == 'SHAPE@':
+                row[column] = value
+            elif isinstance(column, tuple):
+                continue
+            elif column != 0:
+                row[column] = value
+        self.table.append(row[1:])
+        return self.table.next_oid - 1
+
+
+def NumPyArrayToFeatureClass(array, path, shape_fields, spatial_reference=None):
+    names = [n for n in array.dtype.names]
+    table = arcpy.Table([(n, 'Double') for n in names], 'Point', spatial_reference)
+    xs, ys = array[shape_fields[0]].tolist(), array[shape_fields[1]].tolist()
+    cols = [array[n].tolist() for n in names]
+    for i in range(len(array)):
+        table.append([(xs[i], ys[i])] + [c[i] for c in cols])
+    arcpy.TABLES[arcpy._out_path(path)] = table
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Pipeline Benchmark
+#
+#   Times each stage of the AK API tools on synthetic APSI metadata and
+#   Metashape exports (see synthetic.py), with the in-memory arcpy stand-in
+#   (see arcpy_standin) in place of ArcGIS Pro and SDE, and the Metashape
+#   stand-in (see metashape_standin) in place of Metashape:
+#
+#       parse      read the Metashape photo centers export
+#       cached     read it again from the parse cache (with --parse-cache)
+#       estimate   estimate the photo centers of unaligned frames
+#       join       read the APSI rows and join the photo centers
+#       corners    compute the photo corners
+#       write      write the changed APSI rows
+#       polygons   build the footprint polygons
+#       export     export the EROS frame metadata for Metashape
+#       export_apsi    export the frames straight from the APSI table
+#       agl        export the photo heights of the frames from Metashape
+#                  (ground from the tie points)
+#       agl_dem    export the photo heights with the ground from the DEM
+#
+#   and reports the time, rows/sec and peak memory allocated (as traced by
+#   tracemalloc) by each stage for each size:
+#
+#       python benchmarks/bench_pipeline.py --sizes 1000 10000 100000 1000000
+#
+#   Results can be saved (--save) and compared with a saved run (--baseline):
+#   stages slower than the baseline by more than --tolerance fail the run.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, 'arcpy_standin'))
+sys.path.insert(0, os.path.join(HERE, 'metashape_standin'))
+
+import arcpy
+import Metashape
+import synthetic
+
+# Stages faster than this are not compared with the baseline
+MIN_SECONDS = 0.05
+
+
+class Stages(object):
+    # Time (and trace the peak memory of) the stages of one run
+
+    def __init__(self, frames, memory=True):
+        self.frames = frames
+        self.memory = memory
+        self.results = []
+
+    def run(self, name, func, rows=None):
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+        # Peak of the memory allocated by the stage
+        peak = tracemalloc.get_traced_memory()[1] - before if self.memory else None
+        rows = self.frames if rows is None else rows
+        self.results.append({'frames': self.frames, 'stage': name,
+                             'seconds': seconds, 'rows': rows,
+                             'rows_per_sec': rows / seconds if seconds > 0 else None,
+                             'peak_mb': peak / 2.0**20 if peak is not None else None})
+        return value
+
+
+def run_size(n, seed, workdir, processes, memory, cached=False):
+    import pandas as pd
+    import akapi_core as core
+    from akapi_storage import ArcpyStorage
+    import CreatePhotoFootprints_AKAPI_ProPy3compatible as cpf
+    import ExportGeographicMetadata_ProPy3compatible as export
+    import export_camera_coords_agl as agl
+
+    arcpy.TABLES.clear()
+    arcpy.env.workspace = workdir
+    frames = synthetic.Frames(n, seed)
+    apsi = os.path.join(workdir, 'APSI')
+    synthetic.load_table(arcpy, apsi, synthetic.APSI_FIELDS, frames.apsi_rows())
+    eros = os.path.join(workdir, 'EROS')
+    synthetic.load_table(arcpy, eros, synthetic.EROS_FIELDS, frames.eros_rows())
+    photos = os.path.join(workdir, 'photos_{0}.txt'.format(n))
+    frames.write_metashape(photos)
+    storage = ArcpyStorage(apsi)
+
+    stages = Stages(n, memory)
+    ms, pc, missing = stages.run('parse', lambda: core.read_vertical([photos]))
+    if cached:
+        stages.run('cached', lambda: core.read_vertical([photos]))
+
+    def estimate():
+        line_rows = [row[1:] for row in storage.read(core.LINE_FIELDS)]
+        return core.estimate_missing(line_rows, pc, missing)
+    estimates = stages.run('estimate', estimate, rows=len(missing))
+    pc = pd.concat([pc, estimates], ignore_index=True)
+
+    update_fields = core.VERTICAL_FIELDS[0]
+    fields = update_fields + [fld for fld in core.FRAME_FIELDS.values()
+                              if fld not in update_fields]
+
+    def join():
+        centers = core.index_centers(pc, core.VERTICAL_FIELDS[1])
+        rows = storage.read(fields)
+        core.join_centers(rows, centers, core.update_vertical_row)
+        return rows
+    rows = stages.run('join', join)
+
+    corners = stages.run('corners', lambda: core.corner_rows(rows, fields, processes))
+
+    nu = len(update_fields)
+    changes = dict((row[0], row[1:nu+1] + corners[row[0]]) for row in rows)
+    stages.run('write', lambda: storage.update(update_fields + core.CORNER_FIELDS,
+                                               changes))
+
+    def polygons():
+        points = os.path.join(workdir, 'APSI_points')
+        arcpy.XYTableToPoint_management(apsi, points, 'CENTER_LON', 'CENTER_LAT',
+                                        '', cpf.spatialRef)
+        cpf.BuildPolys(points, workdir, 'APSI_footprints')
+    stages.run('polygons', polygons)
+
+    arcpy.PARAMS.clear()
+    arcpy.PARAMS.update({0: eros, 1: os.path.join(workdir, 'eros_{0}.txt'.format(n)),
+                         2: 'true', 3: '0', 4: '.tif'})
+    stages.run('export', export.main)
+    arcpy.PARAMS.update({0: apsi, 1: os.path.join(workdir, 'apsi_{0}.txt'.format(n))})
+    stages.run('export_apsi', export.main)
+
+    Metashape.app.save_path = os.path.join(workdir, 'agl_{0}.txt'.format(n))
+    synthetic.load_chunk(Metashape, frames)
+    stages.run('agl', agl.export_camera_height)
+    # The stage includes the export of the DEM of the chunk
+    synthetic.load_chunk(Metashape, frames, dem=True)
+    stages.run('agl_dem', lambda: agl.export_camera_height(agl.DEM))
+    return stages.results
+
+
+def print_table(results):
+    print('{0:>9} {1:<12} {2:>10} {3:>12} {4:>10}'.format(
+        'frames', 'stage', 'seconds', 'rows/sec', 'peak MB'))
+    for r in results:
+        print('{0:>9} {1:<12} {2:>10.3f} {3:>12} {4:>10}'.format(
+            r['frames'], r['stage'], r['seconds'],
+            '{0:.0f}'.format(r['rows_per_sec']) if r['rows_per_sec'] else '-',
+            '{0:.1f}'.format(r['peak_mb']) if r['peak_mb'] is not None else '-'))
+
+
+def compare(results, baseline, tolerance):
+    # Stages slower than tolerance times their baseline time
+    base = dict(((r['frames'], r['stage']), r['seconds']) for r in baseline)
+    slower = []
+    for r in results:
+        before = base.get((r['frames'], r['stage']))
+        if before is None or r['seconds'] < MIN_SECONDS:
+            continue
+        if r['seconds'] > tolerance * before:
+            slower.append((r['frames'], r['stage'], before, r['seconds']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the stages of the AK API tools.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='numbers of frames (default 1000 10000 100000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=1,
+                        help='processes for the corner computation')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not trace peak memory (tracing slows the stages)')
+    parser.add_argument('--parse-cache', action='store_true',
+                        help='also time reading the photo centers from the parse cache')
+    parser.add_argument('--save', help='save the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with results saved by --save')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='fail stages slower than tolerance x baseline (default 1.5)')
+    args = parser.parse_args(argv)
+
+    # Only warnings from the tools
+    from akapi_log import get_logger
+    get_logger().setLevel(logging.WARNING)
+
+    if not args.no_memory:
+        tracemalloc.start()
+    results = []
+    workdir = tempfile.mkdtemp(prefix='akapi_bench_')
+    # The chunk DEMs are exported to temporary folders in workdir
+    tempfile.tempdir = workdir
+    # The parse stage always parses: the parse cache, if used, starts empty
+    os.environ['AKAPI_CACHE'] = os.path.join(workdir, 'cache') if args.parse_cache else '0'
+    for n in args.sizes:
+        results.extend(run_size(n, args.seed, workdir, args.processes,
+                                not args.no_memory, args.parse_cache))
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = compare(results, json.load(f)['results'], args.tolerance)
+        for frames, stage, before, after in slower:
+            print('SLOWER {0} frames {1}: {2:.3f}s -> {3:.3f}s'.format(
+                frames, stage, before, after))
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API Startup Benchmark
+#
+#   Measures the time to import each AK API module and tool script in a fresh
+#   Python process, after arcpy (or Metashape) is imported, as it already is
+#   when a tool runs in ArcGIS Pro. Importing a tool must not read parameters,
+#   open the APSI source or load pandas. The benchmark fails (exit status 1)
+#   if any import takes longer than the budget:
+#
+#       python benchmarks/bench_startup.py [--budget-ms 250] [--repeat 5]
+#
+#   Modules that need arcpy or Metashape are skipped where they are missing,
+#   or use --standin to import the tools with the arcpy and Metashape
+#   stand-ins of the benchmarks (arcpy_standin, metashape_standin).
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['akapi_log',
+           'akapi_scratch',
+           'akapi_storage',
+           'akapi_metrics',
+           'akapi_params',
+           'akapi_cache',
+           'akapi_reader',
+           'akapi_dem',
+           'akapi_core',
+           'ImportPhotoCenters_AKAPI_ProPy3compatible',
+           'CreatePhotoFootprints_AKAPI_ProPy3compatible',
+           'CombineTools_AKAPI',
+           'ExportGeographicMetadata_ProPy3compatible',
+           'export_camera_coords_agl']
+
+# Imports that must not happen when a module is imported
+HEAVY = ['pandas', 'scipy', 'arcgis']
+
+# Run in a fresh process: import the host applications, then time the import
+# of the module and list the heavy modules it loaded
+PROBE = '''
+import importlib, sys, time
+sys.path[0:0] = {path!r}
+for host in ('arcpy', 'Metashape'):
+    try:
+        importlib.import_module(host)
+    except ImportError:
+        pass
+start = time.perf_counter()
+try:
+    importlib.import_module({name!r})
+except ImportError as e:
+    print('skip ' + str(e))
+    sys.exit(0)
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print('{{0:.6f}} {{1}}'.format(elapsed, ','.join(heavy)))
+'''
+
+
+def probe(name, standin=False):
+    # Import time (seconds) of name and the heavy modules it loaded, or None
+    # and the reason it was skipped
+    path = [ROOT]
+    if standin:
+        path.insert(0, os.path.join(ROOT, 'benchmarks', 'arcpy_standin'))
+        path.insert(0, os.path.join(ROOT, 'benchmarks', 'metashape_standin'))
+    code = PROBE.format(path=path, name=name, heavy=HEAVY)
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         universal_newlines=True)
+    if out.returncode != 0:
+        raise RuntimeError('import of {0} failed:\n{1}'.format(name, out.stderr))
+    line = out.stdout.strip().splitlines()[-1]
+    if line.startswith('skip '):
+        return None, line[5:]
+    elapsed, _, heavy = line.partition(' ')
+    return float(elapsed), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the import of the AK API modules.')
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help='maximum import time of a module (default 250 ms)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='fresh processes per module, the median is used')
+    parser.add_argument('--standin', action='store_true',
+                        help='use the arcpy and Metashape stand-ins of the benchmarks')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args(argv)
+
+    failed = []
+    for name in args.modules:
+        times = []
+        heavy = ''
+        for _ in range(args.repeat):
+            elapsed, heavy = probe(name, args.standin)
+            if elapsed is None:
+                break
+            times.append(elapsed)
+        if not times:
+            print('{0:<48} skipped ({1})'.format(name, heavy))
+            continue
+
+        median = sorted(times)[len(times) // 2] * 1000.0
+        status = 'ok'
+        if median > args.budget_ms:
+            status = 'SLOW'
+        if heavy:
+            status = 'LOADS ' + heavy
+        if status != 'ok':
+            failed.append(name)
+        print('{0:<48} {1:8.1f} ms  {2}'.format(name, median, status))
+
+    if failed:
+        print('{0} module(s) over budget or loading heavy modules'.format(len(failed)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Metashape stand-in for the AK API benchmarks
+#
+#   A small replacement for the parts of the Metashape 1.7 API the AGL export
+#   (export_camera_coords_agl.py) uses: a document with one chunk of cameras
+#   in WGS 84, the chunk transform from internal to geocentric coordinates,
+#   the tie point cloud (pickPoint) and the DEM of the chunk. The ground is a
+#   smooth surface, the tie points meet it under each camera and the DEM is
+#   exported as a GeoTIFF of it. Cameras are made by synthetic.load_chunk().
+#   It is only meant to time the Python side of the export, not to
+#   reproduce Metashape.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import math
+import struct
+import uuid
+
+import numpy as np
+
+# WGS 84 ellipsoid
+A = 6378137.0
+INV_F = 298.257223563
+E2 = (2 - 1 / INV_F) / INV_F
+
+WGS84 = ('GEOGCS["WGS 84",DATUM["World Geodetic System 1984",'
+         'SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],'
+         'UNIT["degree",0.01745329251994328]]')
+WGS84_GEOCENTRIC = ('GEOCCS["WGS 84",DATUM["World Geodetic System 1984",'
+                    'SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],'
+                    'UNIT["metre",1]]')
+
+# Data sources, formats and options of chunk.exportRaster()
+ElevationData = 'ElevationData'
+ImageFormatTIFF = 'ImageFormatTIFF'
+
+# Cell size (degrees) of the exported DEM
+DEM_RESOLUTION = 0.01
+
+# No data value of the exported DEM
+DEM_NODATA = -32767.0
+
+
+class Vector(object):
+
+    def __init__(self, values):
+        self._values = [float(v) for v in values]
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __len__(self):
+        return len(self._values)
+
+    x = property(lambda self: self._values[0])
+    y = property(lambda self: self._values[1])
+    z = property(lambda self: self._values[2])
+    w = property(lambda self: self._values[3])
+
+    def list(self):
+        return list(self._values)
+
+
+class Matrix(object):
+    # 4 x 4 matrix (rows of lists)
+
+    def __init__(self, rows):
+        self._rows = [[float(v) for v in row] for row in rows]
+
+    def row(self, index):
+        return Vector(self._rows[index])
+
+    def mulp(self, point):
+        # Transform the point (Vector of 3)
+        x, y, z = point[0], point[1], point[2]
+        return Vector([r[0] * x + r[1] * y + r[2] * z + r[3] for r in self._rows[:3]])
+
+    def inv(self):
+        return Matrix(np.linalg.inv(np.array(self._rows)).tolist())
+
+
+def geodetic(x, y, z):
+    # Longitude, latitude (degrees) and height of the geocentric point x, y, z
+    lon = math.atan2(y, x)
+    p = math.hypot(x, y)
+    lat = math.atan2(z, p * (1 - E2))
+    for _ in range(5):
+        n = A / math.sqrt(1 - E2 * math.sin(lat) ** 2)
+        h = p * math.cos(lat) + z * math.sin(lat) - A * A / n
+        lat = math.atan2(z, p * (1 - E2 * n / (n + h)))
+    n = A / math.sqrt(1 - E2 * math.sin(lat) ** 2)
+    h = p * math.cos(lat) + z * math.sin(lat) - A * A / n
+    return math.degrees(lon), math.degrees(lat), h
+
+
+def geocentric(lon, lat, h):
+    # Geocentric coordinates of longitude, latitude (degrees) and height;
+    # numbers or arrays
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    n = A / np.sqrt(1 - E2 * np.sin(lat) ** 2)
+    return ((n + h) * np.cos(lat) * np.cos(lon),
+            (n + h) * np.cos(lat) * np.sin(lon),
+            (n * (1 - E2) + h) * np.sin(lat))
+
+
+def ground(lon, lat):
+    # Height of the ground at longitude, latitude; numbers or arrays
+    return 350 + 150 * np.sin(np.radians(lon) * 40) * np.cos(np.radians(lat) * 50)
+
+
+class CoordinateSystem(object):
+
+    def __init__(self, wkt=WGS84):
+        self.wkt = wkt
+        self.wkt2 = wkt
+
+    @property
+    def geoccs(self):
+        return CoordinateSystem(WGS84_GEOCENTRIC)
+
+    def project(self, point):
+        if self.wkt.startswith('GEOCCS'):
+            return Vector([point[0], point[1], point[2]])
+        return Vector(geodetic(point[0], point[1], point[2]))
+
+
+class OrthoProjection(object):
+
+    def __init__(self):
+        self.crs = None
+
+
+class ImageCompression(object):
+    TiffCompressionNone = 'TiffCompressionNone'
+    TiffCompressionDeflate = 'TiffCompressionDeflate'
+
+    def __init__(self):
+        self.tiff_compression = self.TiffCompressionNone
+
+
+class Calibration(object):
+
+    def unproject(self, point):
+        # Direction of the axis of the photo, in camera coordinates
+        return Vector([0, 0, 1])
+
+
+class Sensor(object):
+
+    def __init__(self):
+        self.film_camera = False
+        self.width = 9000
+        self.height = 9000
+        self.calibration = Calibration()
+
+
+class Reference(object):
+
+    def __init__(self, location=None):
+        self.location = location
+
+
+class Camera(object):
+    # A photo; center and transform are None if it is not aligned
+
+    def __init__(self, label, sensor, center=None, location=None):
+        self.label = label
+        self.sensor = sensor
+        self.center = center
+        self.transform = None
+        if center is not None:
+            self.transform = Matrix([[1, 0, 0, center[0]], [0, 1, 0, center[1]],
+                                     [0, 0, 1, center[2]], [0, 0, 0, 1]])
+        self.reference = Reference(location)
+
+
+class _Transform(object):
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+
+class PointCloud(object):
+    # Tie points on the ground surface
+
+    def __init__(self, chunk):
+        self.chunk = chunk
+
+    def pickPoint(self, origin, target):
+        # The photos are vertical: the axis meets the ground under the camera
+        T = self.chunk.transform.matrix
+        lon, lat, _ = geodetic(*T.mulp(origin).list())
+        x, y, z = geocentric(lon, lat, ground(lon, lat))
+        return self.chunk._internal.mulp(Vector([x, y, z]))
+
+
+class Elevation(object):
+    # A DEM; keys are unique, as a new DEM gets a new key in Metashape
+
+    def __init__(self):
+        self.key = uuid.uuid4().int % 2**31
+
+
+class Chunk(object):
+
+    def __init__(self, matrix, key=0):
+        self.key = key
+        self.crs = CoordinateSystem()
+        self.transform = _Transform(matrix)
+        self._internal = matrix.inv()
+        self.cameras = []
+        self.point_cloud = PointCloud(self)
+        self.elevation = None
+
+    def exportRaster(self, path, source_data=ElevationData, image_format=None,
+                     projection=None, image_compression=None, **kwargs):
+        # Write the DEM covering the cameras as an uncompressed GeoTIFF
+        T = self.transform.matrix
+        points = [geodetic(*T.mulp(camera.center).list())
+                  for camera in self.cameras if camera.center is not None]
+        lon = [p[0] for p in points]
+        lat = [p[1] for p in points]
+        step = DEM_RESOLUTION
+        left = math.floor(min(lon) / step) * step - 2 * step
+        top = math.ceil(max(lat) / step) * step + 2 * step
+        width = int(math.ceil((max(lon) - left) / step)) + 3
+        height = int(math.ceil((top - min(lat)) / step)) + 3
+        cell_lon = left + (np.arange(width) + 0.5) * step
+        cell_lat = top - (np.arange(height) + 0.5) * step
+        values = ground(cell_lon[None, :], cell_lat[:, None]).astype('<f4')
+        write_geotiff(path, values, left, top, step, DEM_NODATA)
+
+
+def write_geotiff(path, values, left, top, step, nodata):
+    # Write values (rows x columns of float32) as a single strip GeoTIFF with
+    # the upper left corner left, top and square cells of size step
+    height, width = values.shape
+    data = np.ascontiguousarray(values, dtype='<f4').tobytes()
+    nodata = '{0:g}\0'.format(nodata).encode('ascii')
+    scale = struct.pack('<3d', step, step, 0)
+    tiepoint = struct.pack('<6d', 0, 0, 0, left, top, 0)
+    # tag, type, count, value (inline) or bytes (after the directory)
+    tags = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, 32),
+            (259, 3, 1, 1), (273, 4, 1, 8), (277, 3, 1, 1),
+            (278, 4, 1, height), (279, 4, 1, len(data)), (339, 3, 1, 3),
+            (33550, 12, 3, scale), (33922, 12, 6, tiepoint),
+            (42113, 2, len(nodata), nodata)]
+    directory = 8 + len(data)
+    extra = directory + 2 + 12 * len(tags) + 4
+    entries = []
+    blobs = []
+    for tag, typ, count, value in tags:
+        if isinstance(value, bytes):
+            entries.append(struct.pack('<HHII', tag, typ, count, extra))
+            blobs.append(value)
+            extra += len(value)
+        elif typ == 3:
+            entries.append(struct.pack('<HHIHH', tag, typ, count, value, 0))
+        else:
+            entries.append(struct.pack('<HHII', tag, typ, count, value))
+    with open(path, 'wb') as f:
+        f.write(b'II' + struct.pack('<HI', 42, directory))
+        f.write(data)
+        f.write(struct.pack('<H', len(tags)) + b''.join(entries) + struct.pack('<I', 0))
+        f.write(b''.join(blobs))
+
+
+class Document(object):
+
+    def __init__(self):
+        self.chunks = []
+
+    @property
+    def chunk(self):
+        return self.chunks[0] if self.chunks else None
+
+
+class Application(object):
+    # The file dialogs return save_path and open_path
+
+    def __init__(self):
+        self.version = '1.7.6'
+        self.document = Document()
+        self.save_path = ''
+        self.open_path = ''
+        self.menu = {}
+
+    def getSaveFileName(self, hint='', filter=''):
+        return self.save_path
+
+    def getOpenFileName(self, hint='', filter=''):
+        return self.open_path
+
+    def addMenuItem(self, label, func):
+        self.menu[label] = func
+
+
+app = Application()
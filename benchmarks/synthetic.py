@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Synthetic APSI and Metashape data for the AK API benchmarks
+#
+#   Generates APSI metadata rows with the structure of a real inventory:
+#   projects of several rolls, each roll flown as flight lines of numbered
+#   frames along a heading. It also generates the matching Metashape photo
+#   centers export, with runs of unaligned frames, and the EROS frame metadata
+#   the export tool reads, and a Metashape chunk of the frames for the AGL
+#   export (see metashape_standin). Data is generated from a seed, so runs
+#   compare.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import math
+
+import numpy as np
+
+# APSI fields of the generated rows (after the OBJECTID)
+APSI_FIELDS = [('USGS_ENTITY_ID_NO', 'String'),
+               ('VENDOR_ID', 'String'),
+               ('FLIGHT_LINE_NAME', 'String'),
+               ('ROLL_NO', 'String'),
+               ('FLIGHT_LINE_NO', 'String'),
+               ('PHOTO_FRAME_NO', 'Integer'),
+               ('CENTER_LAT', 'Double'),
+               ('CENTER_LON', 'Double'),
+               ('PHOTO_SCALE_QTY', 'Integer'),
+               ('LENS_FOCAL_LENGTH_QTY', 'Double'),
+               ('OBLIQUE_DIR_TXT', 'String')] + \
+              [(name, 'Double') for name in ['UR_LON', 'UR_LAT', 'UL_LON', 'UL_LAT',
+                                             'LL_LON', 'LL_LAT', 'LR_LON', 'LR_LAT']]
+
+# EROS frame metadata fields read by the export tool
+EROS_FIELDS = [('Photo ID', 'String'),
+               ('Center L_2', 'Double'),
+               ('Center L_1', 'Double'),
+               ('Flying Hei', 'Double'),
+               ('Scale', 'Integer'),
+               ('Focal Leng', 'String')]
+
+
+class Frames(object):
+    # Columns of n generated frames
+
+    def __init__(self, n, seed=0, unaligned=0.03, missing_scale=0.1):
+        rng = np.random.RandomState(seed)
+        self.n = n
+
+        # Flight lines of 10 to 60 frames, 4 to 12 lines per roll and 1 to 6
+        # rolls per project
+        sizes = []
+        while sum(sizes) < n:
+            sizes.append(rng.randint(10, 61))
+        sizes[-1] -= sum(sizes) - n
+        sizes = [s for s in sizes if s > 0]
+        lines = len(sizes)
+        line_no = np.zeros(lines, dtype=int)
+        roll_no = np.zeros(lines, dtype=int)
+        project_no = np.zeros(lines, dtype=int)
+        line, roll, project = 0, 0, 0
+        per_roll, per_project = rng.randint(4, 13), rng.randint(1, 7)
+        for k in range(lines):
+            if line == per_roll:
+                line, roll = 0, roll + 1
+                per_roll = rng.randint(4, 13)
+            if roll == per_project:
+                roll, project = 0, project + 1
+                per_project = rng.randint(1, 7)
+            line += 1
+            line_no[k], roll_no[k], project_no[k] = line, roll, project
+
+        line_of = np.repeat(np.arange(lines), sizes)
+        starts = np.cumsum([0] + sizes[:-1])
+        self.frame_no = np.arange(n) - np.repeat(starts, sizes) + 1
+
+        # Flight lines start near their project and follow a heading, about
+        # 1 km between frames at 1:20,000
+        origin_lon = -160 + 20 * rng.rand(project_no.max() + 1)
+        origin_lat = 58 + 10 * rng.rand(project_no.max() + 1)
+        start_lon = origin_lon[project_no] + 0.5 * rng.rand(lines)
+        start_lat = origin_lat[project_no] + 0.2 * rng.rand(lines) + 0.02 * line_no
+        heading = rng.choice([0, math.pi / 2, math.pi, 1.5 * math.pi], lines) + \
+            rng.normal(0, 0.05, lines)
+        step = 0.009
+        k = self.frame_no - 1
+        lat = start_lat[line_of] + step * k * np.sin(heading[line_of])
+        lon = start_lon[line_of] + step * k * np.cos(heading[line_of]) / \
+            np.cos(np.radians(start_lat[line_of]))
+        self.lat = lat + rng.normal(0, 1e-4, n)
+        self.lon = lon + rng.normal(0, 1e-4, n)
+
+        self.scale = np.repeat(rng.choice([20000, 40000, 60000, 63360], lines), sizes)
+        self.focal = np.repeat(rng.choice([152.4, 153.0, 209.5], lines), sizes)
+        self.ground = np.repeat(200 + 300 * rng.rand(lines), sizes)
+        self.height = self.scale * self.focal / 1000.0
+        self.has_scale = rng.rand(n) >= missing_scale
+
+        self.project = np.array(['Project %d' % p for p in range(project_no.max() + 1)],
+                                dtype=object)[project_no][line_of]
+        self.roll = np.array(['%d' % (r + 1) for r in range(roll_no.max() + 1)],
+                             dtype=object)[roll_no][line_of]
+        self.line = np.array(['%d' % l for l in range(line_no.max() + 1)],
+                             dtype=object)[line_no][line_of]
+        self.entity = np.array(['1%012d' % i for i in range(1, n + 1)], dtype=object)
+
+        # Runs of 1 to 3 unaligned frames
+        aligned = np.ones(n, dtype=bool)
+        for start in np.flatnonzero(rng.rand(n) < unaligned / 2.0):
+            aligned[start:start + rng.randint(1, 4)] = False
+        self.aligned = aligned
+
+    def apsi_rows(self):
+        # APSI rows (values of APSI_FIELDS) with photo centers still to import
+        rows = []
+        for i in range(self.n):
+            rows.append(['AR' + self.entity[i], 'V%d' % (i + 1), self.project[i],
+                         self.roll[i], self.line[i], int(self.frame_no[i]),
+                         None, None,
+                         int(self.scale[i]) if self.has_scale[i] else None,
+                         float(self.focal[i]), None] + [None] * 8)
+        return rows
+
+    def eros_rows(self):
+        # EROS frame metadata rows (values of EROS_FIELDS)
+        rows = []
+        for i in range(self.n):
+            rows.append([self.entity[i], float(self.lon[i]), float(self.lat[i]),
+                         float(self.height[i] * 3.28), int(self.scale[i]),
+                         '%.1f mm' % self.focal[i]])
+        return rows
+
+    def write_metashape(self, path, oblique=False):
+        # Write the Metashape photo centers export of the frames
+        with open(path, 'w') as f:
+            f.write('#CoordinateSystem: GEOGCS["WGS 84"]\n')
+            if oblique:
+                f.write('#Label\tX\tY\tZ\tX_est\tY_est\tDirection\n')
+            else:
+                f.write('#Label\tX\tY\tZ\tX_est\tY_est\tZ_est\tH_est\tH_ground\n')
+            for i in range(self.n):
+                label = self.entity[i] + '.tif'
+                source = '{0:.6f}\t{1:.6f}\t{2:.3f}'.format(
+                    self.lon[i], self.lat[i], self.height[i])
+                if not self.aligned[i]:
+                    f.write('{0}\t{1}\t\t\t\t\t\n'.format(label, source) if not oblique
+                            else '{0}\t{1}\t\t\t\n'.format(label, source))
+                elif oblique:
+                    f.write('{0}\t{1}\t{2:.6f}\t{3:.6f}\t{4}\n'.format(
+                        label, source, self.lon[i], self.lat[i], 'NESW'[i % 4]))
+                else:
+                    z = self.ground[i] + self.height[i]
+                    f.write('{0}\t{1}\t{2:.6f}\t{3:.6f}\t{4:.3f}\t{5:.3f}\t{6:.3f}\n'.format(
+                        label, source, self.lon[i], self.lat[i], z, self.height[i],
+                        self.ground[i]))
+
+
+def load_table(arcpy, path, fields, rows, shape_type=None):
+    # Load rows into a table of the arcpy stand-in
+    table = arcpy.Table(fields, shape_type)
+    for row in rows:
+        table.append(row)
+    arcpy.TABLES[path] = table
+    return table
+
+
+def load_chunk(Metashape, frames, dem=False):
+    # Make the frames the cameras of the chunk of the Metashape stand-in
+    # document: aligned frames at their flying height over the ground, with
+    # their photo centers (without height for frames with no scale) as
+    # source locations. The chunk has a DEM if dem is true.
+    lon0, lat0 = float(frames.lon.mean()), float(frames.lat.mean())
+    origin = Metashape.geocentric(lon0, lat0, 0.0)
+    # Internal coordinates: rotated, scaled and moved from geocentric
+    angle = math.radians(30)
+    scale = 250.0
+    matrix = Metashape.Matrix(
+        [[scale * math.cos(angle), -scale * math.sin(angle), 0, origin[0]],
+         [scale * math.sin(angle), scale * math.cos(angle), 0, origin[1]],
+         [0, 0, scale, origin[2]], [0, 0, 0, 1]])
+    chunk = Metashape.Chunk(matrix, key=frames.n)
+    if dem:
+        chunk.elevation = Metashape.Elevation()
+
+    z = Metashape.ground(frames.lon, frames.lat) + frames.height
+    x, y, z = Metashape.geocentric(frames.lon, frames.lat, z)
+    inverse = np.linalg.inv(np.array([matrix.row(i).list() for i in range(4)]))
+    centers = np.column_stack([x, y, z, np.ones(frames.n)]).dot(inverse.T)[:, :3]
+    sensor = Metashape.Sensor()
+    for i in range(frames.n):
+        center = Metashape.Vector(centers[i]) if frames.aligned[i] else None
+        location = Metashape.Vector([frames.lon[i], frames.lat[i],
+                                     frames.height[i] if frames.has_scale[i] else 0.0])
+        chunk.cameras.append(Metashape.Camera(frames.entity[i] + '.tif', sensor,
+                                              center, location))
+    Metashape.app.document.chunks[:] = [chunk]
+    return chunk
@@ -8,6 +8,12 @@
 #   orphan projects as part of the BLM/EROS AK API. 
 #   Created at the National Operations Center, Bureau of Land Management.
 #
+#   The ground height under each photo is found by picking the tie point
+#   cloud along the axis of the photo, or, with the DEM export, sampled from
+#   the DEM of the chunk (or from a DEM GeoTIFF in the chunk coordinate
+#   system if the chunk has no DEM) at the nadir points of all photos at
+#   once. Photos outside of the DEM fall back to the tie points.
+#
 #   Some of the Python API code for add_altitude() function is derived from:
 #   'add_altitude_to_reference.py' (github.com/agisoft-llc/metashape-scripts)
 #
@@ -16,17 +22,180 @@
 #------------------------------------------------------------------------------
 
 import Metashape
+import logging
 import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import numpy as np
+
+# Metashape does not put the script folder on the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from akapi_log import get_logger, Progress
+
+log = get_logger('agl')
 
-# Checking compatibility
 comp_version = "1.7"
-version = ".".join(Metashape.app.version.split('.')[:2])
-if version != comp_version:
-    message = 'Incompatible MS version:{} != {}'.format(version,comp_version)
-    raise Exception(message)
+label = "BLM NOC Tools/Export photo height above ground level (AGL)"
+label_dem = "BLM NOC Tools/Export photo height above ground level (AGL) from DEM"
+
+# Sources of the ground height of the photos
+POINTS = 'points'
+DEM = 'dem'
+
+# Columns of the camera table: source (measured) values of X,Y,Z, estimated
+# values of X,Y,Z, estimated camera height (AGL) h and ground height
+COLUMNS = ['X', 'Y', 'Z', 'X_est', 'Y_est', 'Z_est', 'H_est', 'H_ground']
+
+# WGS 84 ellipsoid (semi-major axis, inverse flattening) and the names of its
+# datum in Metashape and ESRI WKT. Points in other geographic coordinate
+# systems are projected by Metashape.
+WGS84 = (6378137.0, 298.257223563)
+WGS84_DATUMS = ('WGS 84', 'WGS 1984', 'D WGS 1984', 'World Geodetic System 1984')
+
+# Line of the text file of a camera: label and the columns of the table
+row_format = ('{0}\t{1:.6f}\t{2:.6f}\t{3:.3f}\t{4:.6f}\t'
+              '{5:.6f}\t{6:.3f}\t{7:.3f}\t{8:.3f}\n')
+
+def matrix_array(M):
+#    4 x 4 array of the Metashape matrix M
+    return np.array([[r.x, r.y, r.z, r.w] for r in (M.row(i) for i in range(4))])
+
+def ellipsoid(crs):
+#    Semi-major axis and flattening of WGS 84 if crs is the geographic WGS 84
+#    coordinate system, or None for other coordinate systems (projected, with
+#    a vertical datum, on another datum or with a datum shift...), which
+#    Metashape projects with their datum transformation
+    wkt = crs.wkt
+    if not wkt.startswith('GEOGCS'):
+        return None
+    datum = re.search(r'DATUM\["([^"]*)"', wkt)
+    if not datum or datum.group(1).replace('_', ' ') not in WGS84_DATUMS:
+        return None
+    match = re.search(r'SPHEROID\["[^"]*",\s*([-+.\deE]+),\s*([-+.\deE]+)', wkt)
+    if not match or (float(match.group(1)), float(match.group(2))) != WGS84:
+        return None
+    shift = re.search(r'TOWGS84\[([^\]]*)\]', wkt)
+    if shift and any(float(v) for v in shift.group(1).split(',')):
+        return None
+    meridian = re.search(r'PRIMEM\["[^"]*",\s*([-+.\deE]+)', wkt)
+    if meridian and float(meridian.group(1)):
+        return None
+    units = re.findall(r'UNIT\["[^"]*",\s*([-+.\deE]+)', wkt)
+    if units and abs(float(units[-1]) - math.pi / 180) > 1e-12:
+        return None
+    return WGS84[0], 1 / WGS84[1]
+
+def project_points(chunk, points):
+#    Project the points (n x 3 array) in the internal coordinates of the chunk
+#    to the chunk coordinate system: the chunk transform is applied to all
+#    points at once, and so is the projection to geographic WGS 84. Rows of
+#    nan stay nan.
+    T = matrix_array(chunk.transform.matrix)
+    geocentric = points.dot(T[:3, :3].T) + T[:3, 3]
+    shape = ellipsoid(chunk.crs)
+    if shape is None:
+        # other coordinate systems are projected by Metashape
+        projected = np.full(geocentric.shape, np.nan)
+        for i in np.flatnonzero(~np.isnan(geocentric).any(axis=1)):
+            p = chunk.crs.project(Metashape.Vector(geocentric[i].tolist()))
+            projected[i] = (p.x, p.y, p.z)
+        return projected
+
+    # geocentric to longitude, latitude and height above the ellipsoid
+    a, f = shape
+    e2 = f * (2 - f)
+    x, y, z = geocentric.T
+    lon = np.arctan2(y, x)
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p * (1 - e2))
+    for _ in range(5):
+        n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        h = p * np.cos(lat) + z * np.sin(lat) - a * a / n
+        lat = np.arctan2(z, p * (1 - e2 * n / (n + h)))
+    n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    h = p * np.cos(lat) + z * np.sin(lat) - a * a / n
+    return np.column_stack([np.degrees(lon), np.degrees(lat), h])
+
+def pick_point(surface, camera):
+#    Point (in the internal coordinates of the chunk) where the axis of the
+#    photo meets the surface, or None if it does not
+    sensor = camera.sensor
+    origin = camera.center
+    if sensor.film_camera:
+        coords = [int(camera.photo.meta['File/ImageWidth'])/2, 
+                  int(camera.photo.meta['File/ImageWidth'])/2]
+        target = camera.unproject(Metashape.Vector(coords))
+        
+    else:
+        coords = [int(sensor.width)/2, int(sensor.height)/2]
+        target = camera.transform.mulp(
+                    sensor.calibration.unproject(
+                        Metashape.Vector(coords)))
+    
+    return surface.pickPoint(origin, target)
+
+def pick_ground(chunk, surface, cameras):
+#    Ground heights (in the chunk coordinate system) where the axes of the
+#    photos of cameras meet the surface, nan where they do not
+    points = np.full((len(cameras), 3), np.nan)
+    for i, camera in enumerate(cameras):
+        point = pick_point(surface, camera)
+        if point is not None:
+            points[i] = (point.x, point.y, point.z)
+    return project_points(chunk, points)[:, 2]
 
-def export_camera_height():
-#    Export flying/photo height (h) above ground level for each camera
+def chunk_dem_path(chunk, folder):
+#    GeoTIFF of the DEM of the chunk in the chunk coordinate system, exported
+#    to folder
+    path = os.path.join(folder, 'dem.tif')
+    log.info("Exporting the DEM of the chunk...")
+    projection = Metashape.OrthoProjection()
+    projection.crs = chunk.crs
+    compression = Metashape.ImageCompression()
+    compression.tiff_compression = Metashape.ImageCompression.TiffCompressionDeflate
+    chunk.exportRaster(path, source_data=Metashape.ElevationData,
+                       image_format=Metashape.ImageFormatTIFF,
+                       projection=projection, image_compression=compression)
+    return path
+
+def dem_path(chunk):
+#    A DEM GeoTIFF chosen by the user, or None for the DEM of the chunk
+    if chunk.elevation:
+        return None
+    path = Metashape.app.getOpenFileName("Specify DEM GeoTIFF:",
+                                         filter="GeoTIFF (*.tif *.tiff)")
+    if not path:
+        raise Exception("No DEM!")
+    return path
+
+def sample_ground(path, x, y):
+#    Ground heights of the DEM GeoTIFF path at the points x, y (nan outside
+#    of the DEM). Only the window of the DEM around the points is read.
+    from akapi_dem import read_dem, bounds_of
+    bounds = bounds_of(x, y)
+    if bounds is None:
+        return np.full(len(x), np.nan)
+    return read_dem(path, bounds).sample(x, y)
+
+def sample_dem(chunk, path, x, y):
+#    Ground heights of the DEM GeoTIFF path, or of the DEM of the chunk if path
+#    is None, at the points x, y. The DEM of the chunk is exported to a
+#    temporary folder of its own for each run, deleted once it is sampled, so
+#    a DEM of another project or an older DEM of the chunk is never read.
+    if path is not None:
+        return sample_ground(path, x, y)
+    folder = tempfile.mkdtemp(prefix='akapi_dem_')
+    try:
+        return sample_ground(chunk_dem_path(chunk, folder), x, y)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def export_camera_height(ground=POINTS):
+#    Export flying/photo height (h) above ground level for each camera, with
+#    the ground height from the tie points (POINTS) or a DEM (DEM)
 
     doc = Metashape.app.document
     if not len(doc.chunks):
@@ -50,82 +219,62 @@ def export_camera_height():
 #    else:
     
     surface = chunk.point_cloud
-    print(surface)
+    log.debug(surface)
+
+    if ground == DEM:
+        demPath = dem_path(chunk)
+        log.debug(demPath)
 
     textFilePath = Metashape.app.getSaveFileName("Specify export text file:")
 
-    print("Script started...")
+    log.info("Script started...")
+
+    # camera table: one row for each camera, nan for values it does not have
+    cameras = chunk.cameras
+    labels = [camera.label for camera in cameras]
+    table = np.full((len(cameras), len(COLUMNS)), np.nan)
+    # centers of the aligned cameras, in internal coordinates
+    centers = np.full((len(cameras), 3), np.nan)
+    debug = log.isEnabledFor(logging.DEBUG)
+
+    progress = Progress(log, 'reading cameras', total=len(cameras))
+    for i, camera in enumerate(cameras):
+            progress.update()
+            if debug:
+                log.debug(camera.label)
 
-    # initiate lists to store labels and coordinates
-    labels = []
-    # estimated values of X,Y,Z
-    e_x_list = []; e_y_list = []; e_z_list = []
-    # source (measured) values of X,Y,Z
-    s_x_list = []; s_y_list = []; s_z_list = []
-    # estimated camera height (AGL) h
-    e_h_list = []; g_h_list = []
-    
-    for camera in chunk.cameras:
-        
-            sensor = camera.sensor
-            T = chunk.transform.matrix
-            
             if camera.transform:  # just for the aligned cameras
-                labels.append(camera.label)
-                print(camera.label)
-    
-                # estimated values of X,Y,Z
-                estimated = chunk.crs.project(T.mulp(camera.center))
-                e_x_list.append(estimated.x)
-                e_y_list.append(estimated.y)
-                e_z_list.append(estimated.z)
-                
-                # use pick point to find ground height
-                origin = camera.center
-                if sensor.film_camera:
-                    coords = [int(camera.photo.meta['File/ImageWidth'])/2, 
-                              int(camera.photo.meta['File/ImageWidth'])/2]
-                    target = camera.unproject(Metashape.Vector(coords))
-                    
-                else:
-                    coords = [int(sensor.width)/2, int(sensor.height)/2]
-                    target = camera.transform.mulp(
-                                sensor.calibration.unproject(
-                                    Metashape.Vector(coords)))
-                
-                point = surface.pickPoint(origin, target)
-                ground_h = chunk.crs.project(T.mulp(point))
-                h = estimated.z - ground_h.z
-                e_h_list.append(h)
-                g_h_list.append(ground_h.z)
-                
-            else:
-                labels.append(camera.label)
-                print(camera.label)
-                
-                e_x_list.append(math.nan)
-                e_y_list.append(math.nan)
-                e_z_list.append(math.nan)
-                e_h_list.append(math.nan)
-                g_h_list.append(math.nan)
-            
+                center = camera.center
+                centers[i] = (center.x, center.y, center.z)
+
             if camera.reference.location: # just cameras with source location
                 # source (measured) values of X,Y,Z
                 source = camera.reference.location
-                s_x_list.append(source.x)
-                s_y_list.append(source.y)
-                s_z_list.append(source.z)
-            else:
-                s_x_list.append(math.nan)
-                s_y_list.append(math.nan)
-                s_z_list.append(math.nan)
-            
-            # List of coordinate lists for export
-            lists = [labels,
-            s_x_list, s_y_list, s_z_list,
-            e_x_list, e_y_list, e_z_list, 
-            e_h_list,  g_h_list]
+                table[i, 0:3] = (source.x, source.y, source.z)
+    progress.done()
+
+    # estimated values of X,Y,Z of all cameras at once
+    aligned = np.flatnonzero(~np.isnan(centers[:, 0]))
+    table[:, 3:6] = project_points(chunk, centers)
 
+    aligned_cameras = [cameras[i] for i in aligned]
+    if ground == DEM:
+        # ground height of the DEM at the nadir points (X_est, Y_est) of the
+        # aligned cameras
+        ground_z = sample_dem(chunk, demPath, table[aligned, 3],
+                              table[aligned, 4])
+        missing = np.flatnonzero(np.isnan(ground_z))
+        if len(missing):
+            # no DEM under the cameras, use the tie points
+            log.warning("{0} cameras outside of the DEM, ground height from "
+                        "the tie points".format(len(missing)))
+            ground_z[missing] = pick_ground(
+                chunk, surface, [aligned_cameras[i] for i in missing])
+    else:
+        # use pick point to find ground height
+        ground_z = pick_ground(chunk, surface, aligned_cameras)
+    table[aligned, 7] = ground_z
+    table[aligned, 6] = table[aligned, 5] - ground_z
 
     # create text file and write to it
     with open(textFilePath, "w", newline="") as file:
@@ -140,16 +289,24 @@ def export_camera_height():
         file.write(header_str)
         file.write('\n')
         
-        for row in zip(*lists):
-            file.write('{0}\t'.format(row[0])) # label
-            file.write('{0:.6f}\t{1:.6f}\t{2:.3f}\t{3:.6f}\t'.format(
-                    row[1], row[2], row[3], row[4]))
-            file.write('{0:.6f}\t{1:.3f}\t{2:.3f}\t{3:.3f}\n'.format(
-                    row[5], row[6], row[7], row[8]))
+        # one line for each row of the table
+        file.writelines(map(row_format.format, labels, *table.T.tolist()))
 
-    print("Script finished!")
+    log.info("Script finished!")
+
+def main():
+#    Check compatibility and add the export to the Metashape menu. Run when the
+#    script is run in Metashape, not when it is imported.
+    version = ".".join(Metashape.app.version.split('.')[:2])
+    if version != comp_version:
+        message = 'Incompatible MS version:{} != {}'.format(version,comp_version)
+        raise Exception(message)
+
+    Metashape.app.addMenuItem(label, export_camera_height)
+    Metashape.app.addMenuItem(label_dem, lambda: export_camera_height(DEM))
 
 #export_camera_height()
 
-label = "BLM NOC Tools/Export photo height above ground level (AGL)"
-Metashape.app.addMenuItem(label, export_camera_height)
+if __name__ == '__main__':
+    main()
+
@@ -7,6 +7,9 @@ Created on Thu Apr 16 2020
 
 import os
 import sys
+from akapi_log import get_logger
+
+log = get_logger('readme')
 
 if sys.version_info[0] == 2:
     from Tkinter import *
@@ -38,7 +41,7 @@ def main():
     root.destroy()
     
     os.chdir(dirName)
-    print (str(dirName))
+    log.info(str(dirName))
     
     # Get the list of all files in directory tree at given path
     listOfFiles = getListOfFiles(dirName)
@@ -109,10 +112,11 @@ def main():
     file.close()
     
     # Print the files
+    log.info('{0} files described in _README.txt'.format(len(Tiffs)))
     for elem in listOfFiles:
-        print(elem)
+        log.debug(elem)
  
-    print ("****************")
+    log.info("****************")
   
 if __name__ == '__main__':
     main()
\ No newline at end of file
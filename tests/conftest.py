@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         AK API tests
+#
+#   The tests run the shared modules on synthetic APSI metadata and Metashape
+#   exports (see benchmarks/synthetic.py), with the arcpy and Metashape
+#   stand-ins of the benchmarks in place of ArcGIS Pro and Metashape:
+#
+#       python -m pytest tests
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BENCHMARKS = os.path.join(ROOT, 'benchmarks')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+sys.path.insert(0, os.path.join(BENCHMARKS, 'arcpy_standin'))
+sys.path.insert(0, os.path.join(BENCHMARKS, 'metashape_standin'))
+
+import pytest
+
+import arcpy
+import synthetic
+
+# No run reports (see akapi_metrics) and no parse cache (see akapi_cache)
+os.environ['AKAPI_REPORT'] = '0'
+os.environ['AKAPI_CACHE'] = '0'
+
+
+@pytest.fixture
+def frames():
+    return synthetic.Frames(300, seed=3)
+
+
+@pytest.fixture
+def apsi(frames, tmp_path):
+    # APSI table of the frames with their photo centers; frames without a
+    # scale have no photo scale, so their corners cannot be computed
+    arcpy.TABLES.clear()
+    rows = frames.apsi_rows()
+    for i, row in enumerate(rows):
+        row[6], row[7] = float(frames.lat[i]), float(frames.lon[i])
+    path = str(tmp_path / 'APSI')
+    synthetic.load_table(arcpy, path, synthetic.APSI_FIELDS, rows)
+    return path
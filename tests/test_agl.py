@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of the AGL export (export_camera_coords_agl.py)
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+
+import Metashape
+import export_camera_coords_agl as agl
+
+ESRI_WGS84 = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",'
+              '6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],'
+              'UNIT["Degree",0.0174532925199433]]')
+NAD27 = ('GEOGCS["NAD27",DATUM["North American Datum 1927",SPHEROID["Clarke 1866",'
+         '6378206.4,294.9786982139006]],PRIMEM["Greenwich",0],'
+         'UNIT["degree",0.01745329251994328]]')
+SHIFTED = ('GEOGCS["WGS 84",DATUM["World Geodetic System 1984",SPHEROID["WGS 84",'
+           '6378137,298.257223563],TOWGS84[1,2,3,0,0,0,0]],PRIMEM["Greenwich",0],'
+           'UNIT["degree",0.01745329251994328]]')
+
+
+def test_ellipsoid_only_for_wgs84():
+    for wkt in [Metashape.WGS84, ESRI_WGS84]:
+        assert agl.ellipsoid(Metashape.CoordinateSystem(wkt)) is not None
+    for wkt in [NAD27, SHIFTED, Metashape.WGS84_GEOCENTRIC]:
+        assert agl.ellipsoid(Metashape.CoordinateSystem(wkt)) is None
+
+
+class Projected(Metashape.CoordinateSystem):
+    # A coordinate system projected by Metashape, counting the points
+
+    def project(self, point):
+        self.projected = getattr(self, 'projected', 0) + 1
+        return Metashape.CoordinateSystem.project(self, point)
+
+
+def test_other_datums_are_projected_by_metashape(frames):
+    import synthetic
+    chunk = synthetic.load_chunk(Metashape, frames)
+    points = np.array([camera.center.list() for camera in chunk.cameras
+                       if camera.center is not None][:20])
+    expected = agl.project_points(chunk, points)
+    chunk.crs = Projected(NAD27)
+    # The stand-in projects to WGS 84 whatever the coordinate system
+    assert np.allclose(agl.project_points(chunk, points), expected)
+    assert chunk.crs.projected == len(points)
+
+
+def test_chunk_dem_is_exported_for_each_run(frames, tmp_path, monkeypatch):
+    import synthetic
+    Metashape.app.save_path = str(tmp_path / 'agl.txt')
+    exported = []
+
+    def exportRaster(chunk, path, **kwargs):
+        exported.append(path)
+        export(chunk, path, **kwargs)
+    export = Metashape.Chunk.exportRaster
+    monkeypatch.setattr(Metashape.Chunk, 'exportRaster', exportRaster)
+    fallback = []
+    monkeypatch.setattr(agl, 'pick_ground',
+                        lambda chunk, surface, cameras: fallback.extend(cameras))
+    for n in (300, 200):
+        # Chunks of other projects with the same chunk and DEM keys
+        chunk = synthetic.load_chunk(Metashape, synthetic.Frames(n, seed=n), dem=True)
+        chunk.key = 0
+        chunk.elevation.key = 1
+        agl.export_camera_height(agl.DEM)
+    assert len(exported) == 2
+    assert not any(os.path.exists(os.path.dirname(path)) for path in exported)
+    # Each chunk is sampled on its own DEM: no camera falls back to the tie points
+    assert not fallback
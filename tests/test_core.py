@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of akapi_core
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import math
+
+import pytest
+
+import arcpy
+import akapi_core as core
+from akapi_storage import ArcpyStorage
+
+
+def corner_values(path):
+    table = arcpy.TABLES[path]
+    cols = [table.index(fld) for fld in core.CORNER_FIELDS]
+    return [[row[c] for c in cols] for row in table.rows]
+
+
+def test_second_footprint_run_writes_nothing(frames, apsi):
+    # Only the photos with a scale get corners on the first run
+    storage = ArcpyStorage(apsi)
+    changes = core.update_photos(storage, [], None, None)[0]
+    assert len(changes) == frames.has_scale.sum()
+    storage.update(core.CORNER_FIELDS, changes)
+
+    # Photos without a scale have no corners, written as nulls
+    corners = corner_values(apsi)
+    assert any(None in row for row in corners)
+    assert not any(isinstance(v, float) and math.isnan(v) for row in corners for v in row)
+
+    changes = core.update_photos(storage, [], None, None)[0]
+    assert changes == {}
+
+
+def test_nan_corners_are_missing(apsi):
+    # NaN corners written by earlier versions compare equal to null corners
+    storage = ArcpyStorage(apsi)
+    storage.update(core.CORNER_FIELDS, core.update_photos(storage, [], None, None)[0])
+    table = arcpy.TABLES[apsi]
+    cols = [table.index(fld) for fld in core.CORNER_FIELDS]
+    for row in table.rows:
+        for c in cols:
+            if row[c] is None:
+                row[c] = float('nan')
+    assert core.update_photos(storage, [], None, None)[0] == {}
+
+
+def test_same_corners():
+    assert core.same_corners([1.0, None], [1.0, None])
+    assert core.same_corners([1.0, float('nan')], [1.0, None])
+    assert not core.same_corners([1.0, None], [1.0, 2.0])
+    assert not core.same_corners([1.0, 2.0], [1.0, None])
+    assert not core.same_corners(None, [1.0, 2.0])
+
+
+def test_import_photo_height_nan(frames, apsi, tmp_path):
+    # Aligned cameras whose ground was not found are exported with a photo
+    # height (H_est) of nan; their scale cannot be estimated
+    path = str(tmp_path / 'photos.txt')
+    frames.write_metashape(path)
+    no_height = set()
+    with open(path) as f:
+        lines = f.readlines()
+    for i in range(frames.n):
+        if frames.aligned[i] and not frames.has_scale[i]:
+            values = lines[i+2].split('\t')
+            values[-2:] = ['nan', 'nan\n']
+            lines[i+2] = '\t'.join(values)
+            no_height.add(frames.entity[i])
+    assert no_height
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+    storage = ArcpyStorage(apsi)
+    centers = core.load_centers([path], storage)[1]
+    fields = core.VERTICAL_FIELDS[0]
+    changes = core.update_photos(storage, fields, centers, core.update_vertical_row)[0]
+    storage.update(fields + core.CORNER_FIELDS, changes)
+
+    table = arcpy.TABLES[apsi]
+    photo_id, scale = table.index(fields[0]), table.index('PHOTO_SCALE_QTY')
+    for row in table.rows:
+        if row[photo_id] in no_height:
+            assert row[scale] is None
+
+
+def test_estimate_missing_from_known_values():
+    import numpy as np
+    import pandas as pd
+    # Frames 1 to 5 of a flight line; frames 1 and 2 have no photo height and
+    # frame 3 is missing. B1 has no roll number.
+    pc = pd.DataFrame({'PhotoID': ['A1', 'A2', 'A4', 'A5'],
+                       'Longitude': [1.0, 2.0, 4.0, 5.0],
+                       'Latitude': [1.0, 2.0, 4.0, 5.0],
+                       'Altitude': [np.nan, np.nan, 40.0, 50.0],
+                       'PhotoHeight': [np.nan, np.nan, 4.0, 5.0]})
+    line_rows = [('A%d' % i, 'R', 'L', i) for i in range(1, 6)] + [('B1', None, 'L', 1)]
+    est = core.estimate_missing(line_rows, pc, ['A3', 'B1'])
+    assert est.PhotoID.tolist() == ['A3']
+    assert est.Longitude[0] == 3.0
+    assert est.Altitude[0] == 30.0
+    assert est.PhotoHeight[0] == 3.0
+
+
+def test_estimate_missing_extrapolates_two_frames():
+    import numpy as np
+    import pandas as pd
+    # Frames 1 to 6 of a flight line; only frames 3 and 4 have photo centers,
+    # so both ends of the line are extrapolated from them
+    pc = pd.DataFrame({'PhotoID': ['A3', 'A4'],
+                       'Longitude': [-150.3, -150.4],
+                       'Latitude': [64.03, 64.04],
+                       'Altitude': [3000.0, 3010.0],
+                       'PhotoHeight': [2000.0, 2010.0]})
+    line_rows = [('A%d' % i, 'R', 'L', i) for i in range(1, 7)]
+    est = core.estimate_missing(line_rows, pc, ['A1', 'A2', 'A5', 'A6'])
+    frame_no = np.array([1, 2, 5, 6])
+    assert est.PhotoID.tolist() == ['A1', 'A2', 'A5', 'A6']
+    assert np.allclose(est.Longitude, -150.0 - 0.1*frame_no)
+    assert np.allclose(est.Latitude, 64.0 + 0.01*frame_no)
+    assert np.allclose(est.Altitude, 2970.0 + 10.0*frame_no)
+    assert np.allclose(est.PhotoHeight, 1970.0 + 10.0*frame_no)
+
+
+def test_estimate_missing_spline_fills_gap():
+    pytest.importorskip('scipy')
+    import numpy as np
+    import pandas as pd
+    # A flight line curving as a cubic of the frame number, with frames 5 to 8
+    # missing: the cubic spline through the other frames follows the curve
+    frame_no = np.arange(1, 13)
+    lon = -150.0 + 0.01*frame_no - 0.002*frame_no**2 + 0.0001*frame_no**3
+    known = (frame_no < 5) | (frame_no > 8)
+    pc = pd.DataFrame({'PhotoID': ['A%d' % i for i in frame_no[known]],
+                       'Longitude': lon[known],
+                       'Latitude': 64.0 + 0.01*frame_no[known],
+                       'Altitude': np.full(known.sum(), 3000.0),
+                       'PhotoHeight': np.full(known.sum(), 2000.0)})
+    line_rows = [('A%d' % i, 'R', 'L', i) for i in frame_no]
+    missing = ['A%d' % i for i in frame_no[~known]]
+    est = core.estimate_missing(line_rows, pc, missing, 'spline')
+    assert est.PhotoID.tolist() == missing
+    assert np.allclose(est.Longitude, lon[~known], rtol=0, atol=1e-12)
+    assert np.allclose(est.Latitude, 64.0 + 0.01*frame_no[~known])
+    # Linear interpolation cuts across the curve
+    linear = core.estimate_missing(line_rows, pc, missing)
+    assert not np.allclose(linear.Longitude, lon[~known], rtol=0, atol=1e-6)
+
+
+def test_read_chunks(tmp_path):
+    import synthetic
+    from akapi_reader import read_header
+    path = str(tmp_path / 'photos.txt')
+    synthetic.Frames(30000, seed=1).write_metashape(path)
+    cols = ['PhotoID', 'X_est', 'Y_est', 'Z_est', 'H_est']
+    header = read_header(path)
+    chunks = core.read_chunks(path, core.VERTICAL, cols, header)
+    frame = core.read_columns(path, core.VERTICAL, cols, header)
+    frame['EntityID'] = core.normalize_photo_ids(frame.PhotoID)
+    assert chunks.equals(frame)
+
+
+def test_update_visits_only_changed_rows(monkeypatch, apsi):
+    # The update cursor reads only the rows that change, not the selection
+    visited = []
+    values = arcpy.da.UpdateCursor._values
+
+    def counted(cursor):
+        for row in values(cursor):
+            visited.append(row[0])
+            yield row
+    monkeypatch.setattr(arcpy.da.UpdateCursor, '_values', counted)
+
+    storage = ArcpyStorage(apsi)
+    changes = core.update_photos(storage, [], None, None)[0]
+    assert 0 < len(changes) < len(arcpy.TABLES[apsi].rows)
+    assert storage.update(core.CORNER_FIELDS, changes, chunk=50) == len(changes)
+    assert sorted(visited) == sorted(changes)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of the photo corners (akapi_core.corner_rows)
+#
+#   The corners are compared to a port of corner_photo of the first version of
+#   Create Photo Footprints, which computed the photos one at a time.
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import math
+from operator import itemgetter
+
+import numpy as np
+import pytest
+
+import akapi_core as core
+
+FIELDS = [core.FRAME_FIELDS[col] for col in core.FRAME_FIELDS]
+PHOTO = dict((fld, i+1) for i, fld in enumerate(FIELDS))
+
+
+def baseline_corner_photo(prj_photo, orderings):
+    # corner_photo of the first version, for the rows ([OID]+values of FIELDS)
+    # of one flight line. Returns {OID: UR_X, UR_Y, UL_X, UL_Y, LL_X, LL_Y,
+    # LR_X, LR_Y} and adds the ordering of the corners of each photo (0 to 3)
+    # to orderings.
+    nm = len(prj_photo)
+    sorted_rds = sorted(prj_photo, key=itemgetter(PHOTO['PHOTO_FRAME_NO']))
+    corners = {}
+    for i in range(0, nm):
+        if nm == 1:
+            theta = 0  # Flight direction for "one point only" flight
+        scale = sorted_rds[i][PHOTO['PHOTO_SCALE_QTY']]
+        # Dealing with 9" by 9" photos
+        width_photo = (9*2.54*scale)/100.0
+        x1 = math.radians(sorted_rds[i][PHOTO['CENTER_LON']])
+        y1 = math.radians(sorted_rds[i][PHOTO['CENTER_LAT']])
+
+        # converted the arc length located on the assigned latitude
+        arc_lat = 111132.92-559.82*math.cos(2*y1)+1.175*math.cos(4*y1)
+        rad_photo = math.radians((width_photo/arc_lat)/2.0)  # half of photo width
+        rad_photoS = math.sqrt(2)*rad_photo  # slant of (photo width/2)
+        if i < nm-1:
+            x2 = math.radians(sorted_rds[i+1][PHOTO['CENTER_LON']])
+            y2 = math.radians(sorted_rds[i+1][PHOTO['CENTER_LAT']])
+            theta = math.atan2(y1-y2, x1-x2)
+
+        thetaFlt = theta  # For the last point of each flight line
+        # computed 4 corner points
+        x11 = math.degrees(x1+rad_photoS*math.cos(thetaFlt+math.pi/4.0))
+        y11 = math.degrees(y1+rad_photoS*math.sin(thetaFlt+math.pi/4.0))
+        x22 = math.degrees(x1+rad_photoS*math.cos(thetaFlt+math.pi/4.0+math.pi/2.0))
+        y22 = math.degrees(y1+rad_photoS*math.sin(thetaFlt+math.pi/4.0+math.pi/2.0))
+        x33 = math.degrees(x1+rad_photoS*math.cos(thetaFlt+math.pi/4.0+math.pi))
+        y33 = math.degrees(y1+rad_photoS*math.sin(thetaFlt+math.pi/4.0+math.pi))
+        x44 = math.degrees(x1+rad_photoS*math.cos(thetaFlt+math.pi/4.0+1.5*math.pi))
+        y44 = math.degrees(y1+rad_photoS*math.sin(thetaFlt+math.pi/4.0+1.5*math.pi))
+        ang_qt = thetaFlt+math.pi/4.0
+        # arrange the sequence of corner points following the order of
+        # UR_X, UR_Y, UL_X, UL_Y, LL_X, LL_Y, LR_X, and LR_Y
+        if (ang_qt >= 0.0) & (ang_qt < (math.pi/2.0)):
+            row = [x11, y11, x22, y22, x33, y33, x44, y44]
+            orderings.add(0)
+        elif ((ang_qt >= (math.pi/2.0)) & (ang_qt < math.pi)) | ((ang_qt >= (-1.5*math.pi)) & (ang_qt < (-1.0*math.pi))):
+            row = [x44, y44, x11, y11, x22, y22, x33, y33]
+            orderings.add(1)
+        elif ((ang_qt >= (-1.0*math.pi)) & (ang_qt < (-1.0*(math.pi/2.0)))) | ((ang_qt >= math.pi) & (ang_qt < 1.5*math.pi)):
+            row = [x33, y33, x44, y44, x11, y11, x22, y22]
+            orderings.add(2)
+        else:
+            row = [x22, y22, x33, y33, x44, y44, x11, y11]
+            orderings.add(3)
+        corners[sorted_rds[i][0]] = row
+    return corners
+
+
+def baseline_corners(rows, orderings=None):
+    # The corners of rows, one (project, roll, flight line) group at a time
+    lines = {}
+    for row in rows:
+        key = tuple(row[PHOTO[fld]] for fld in
+                    ['FLIGHT_LINE_NAME', 'ROLL_NO', 'FLIGHT_LINE_NO'])
+        lines.setdefault(key, []).append(row)
+    corners = {}
+    for line in lines.values():
+        corners.update(baseline_corner_photo(line, set() if orderings is None else orderings))
+    return corners
+
+
+def flight_line_rows(oid, flight, bearing, photos, rng):
+    # Rows of a flight line of photos flown along bearing (degrees counter
+    # clockwise from east), in shuffled order
+    lon0, lat0 = -150.0 + rng.uniform(-2, 2), 64.0 + rng.uniform(-2, 2)
+    step = 0.01
+    rows = []
+    for k in range(photos):
+        lon = lon0 + k*step*math.cos(math.radians(bearing))
+        lat = lat0 + k*step*math.sin(math.radians(bearing))
+        values = {'VENDOR_ID': 'V%s' % (oid+k),
+                  'FLIGHT_LINE_NAME': 'AK%s' % (flight % 3),
+                  'ROLL_NO': str(flight % 2),
+                  'FLIGHT_LINE_NO': str(flight),
+                  'PHOTO_SCALE_QTY': float(rng.choice([24000, 40000, 60000])),
+                  'CENTER_LAT': lat, 'CENTER_LON': lon,
+                  'PHOTO_FRAME_NO': 100 + k}
+        rows.append([oid+k] + [values[fld] for fld in FIELDS])
+    return [rows[k] for k in rng.permutation(photos)]
+
+
+def flight_lines():
+    # Single photo lines, and lines flown in both directions along the axes
+    # and the diagonals, so the flight directions fall in all four quadrant
+    # orderings of the corners
+    rng = np.random.RandomState(5)
+    rows = []
+    flight = 0
+    for bearing in [0, 180, 90, 270, 30, 210, 120, 300, 60, 240, 150, 330]:
+        for photos in (1, 2, 7):
+            flight += 1
+            rows += flight_line_rows(1 + len(rows), flight, bearing, photos, rng)
+    return rows
+
+
+@pytest.mark.parametrize('processes', [1, 3])
+def test_corners_match_baseline(processes):
+    rows = flight_lines()
+    orderings = set()
+    expected = baseline_corners(rows, orderings)
+    corners = core.corner_rows(rows, FIELDS, processes)
+    assert sorted(corners) == sorted(expected)
+    for oid in expected:
+        assert np.allclose(corners[oid], expected[oid], rtol=0, atol=1e-12)
+    # The lines cover every ordering of the corners
+    assert orderings == set(range(4))
+
+
+def test_corners_of_reversed_flight_line():
+    # A flight line flown the other way has the same footprints, with the same
+    # corners: the corners are ordered by the quadrant of the flight direction
+    rng = np.random.RandomState(1)
+    rows = flight_line_rows(1, 1, 0, 5, rng)
+    expected = baseline_corners(rows)
+    for row in rows:
+        row[PHOTO['PHOTO_FRAME_NO']] = 200 - row[PHOTO['PHOTO_FRAME_NO']]
+    reversed_expected = baseline_corners(rows)
+    corners = core.corner_rows(rows, FIELDS)
+    for oid in expected:
+        assert np.allclose(corners[oid], reversed_expected[oid], rtol=0, atol=1e-12)
+        assert np.allclose(corners[oid], expected[oid], rtol=0, atol=1e-9)
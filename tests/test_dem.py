@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of the DEM sampling (akapi_dem)
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import akapi_dem
+
+LEFT, TOP, STEP = -150.5, 64.5, 0.01
+NODATA = -32767.0
+
+
+def encode(block, predictor, dtype):
+    # Bytes of a strip or tile with the TIFF predictor of the reader
+    if predictor == 3:
+        # Floating point predictor: the bytes of each row, most significant
+        # first, are differenced
+        size = dtype.itemsize
+        rows = block.astype(dtype.newbyteorder('>')).view(np.uint8)
+        rows = rows.reshape(len(block), -1, size).transpose(0, 2, 1).reshape(len(block), -1)
+        return np.diff(rows, axis=1, prepend=np.uint8(0)).astype(np.uint8).tobytes()
+    return block.astype(dtype).tobytes()
+
+
+def write_tiff(path, values, tile=None, deflate=False, predictor=1, nodata=None):
+    # Write values (rows x columns) as a single band GeoTIFF, in strips of 8
+    # rows or in tiles of tile x tile cells, with the upper left corner LEFT,
+    # TOP and cells of STEP degrees
+    dtype = np.dtype('<f{0}'.format(values.dtype.itemsize))
+    height, width = values.shape
+    bw, bh = (tile, tile) if tile else (width, 8)
+    blocks = []
+    for r in range(0, height, bh):
+        for c in range(0, width, bw):
+            block = np.zeros((bh, bw), dtype)
+            part = values[r:r + bh, c:c + bw]
+            block[:part.shape[0], :part.shape[1]] = part
+            if not tile:
+                block = block[:part.shape[0]]
+            data = encode(block, predictor, dtype)
+            blocks.append(zlib.compress(data) if deflate else data)
+    offsets = list(np.cumsum([8] + [len(b) for b in blocks[:-1]]))
+    counts = [len(b) for b in blocks]
+
+    # tag, type, values
+    tags = [(256, 4, [width]), (257, 4, [height]), (258, 3, [dtype.itemsize * 8]),
+            (259, 3, [8 if deflate else 1]), (277, 3, [1]), (317, 3, [predictor]),
+            (339, 3, [3]), (33550, 12, [STEP, STEP, 0.0]),
+            (33922, 12, [0.0, 0.0, 0.0, LEFT, TOP, 0.0])]
+    if tile:
+        tags += [(322, 3, [bw]), (323, 3, [bh]), (324, 4, offsets), (325, 4, counts)]
+    else:
+        tags += [(273, 4, offsets), (278, 4, [bh]), (279, 4, counts)]
+    if nodata is not None:
+        tags.append((42113, 2, '{0:g}\0'.format(nodata).encode('ascii')))
+    tags.sort()
+
+    formats = {2: 's', 3: 'H', 4: 'I', 12: 'd'}
+    directory = 8 + sum(counts)
+    extra = directory + 2 + 12 * len(tags) + 4
+    entries = []
+    blobs = []
+    for tag, typ, value in tags:
+        data = value if typ == 2 else struct.pack(
+            '<{0}{1}'.format(len(value), formats[typ]), *value)
+        if len(data) > 4:
+            entries.append(struct.pack('<HHII', tag, typ, len(value), extra))
+            blobs.append(data)
+            extra += len(data)
+        else:
+            entries.append(struct.pack('<HHI', tag, typ, len(value)) + data.ljust(4, b'\0'))
+    with open(path, 'wb') as f:
+        f.write(b'II' + struct.pack('<HI', 42, directory))
+        f.write(b''.join(blocks))
+        f.write(struct.pack('<H', len(tags)) + b''.join(entries) + struct.pack('<I', 0))
+        f.write(b''.join(blobs))
+
+
+def heights(rows, cols):
+    # Heights of a plane, which bilinear interpolation reproduces anywhere
+    r, c = np.mgrid[0:rows, 0:cols]
+    return 100.0 + 3.0 * c - 2.0 * r
+
+
+def cell_centers(rows, cols):
+    c = np.arange(cols)
+    r = np.arange(rows)
+    return LEFT + (c + 0.5) * STEP, TOP - (r + 0.5) * STEP
+
+
+def no_gdal(monkeypatch):
+    # Read with numpy, as without GDAL
+    import builtins
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == 'osgeo':
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+    monkeypatch.setattr(builtins, '__import__', fake_import)
+
+
+LAYOUTS = [dict(), dict(deflate=True), dict(tile=16), dict(tile=16, deflate=True),
+           dict(tile=16, deflate=True, predictor=3), dict(deflate=True, predictor=3)]
+
+
+@pytest.mark.parametrize('dtype', ['f4', 'f8'])
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_sample_at_cell_centers(tmp_path, monkeypatch, layout, dtype):
+    no_gdal(monkeypatch)
+    path = str(tmp_path / 'dem.tif')
+    values = heights(37, 45).astype(dtype)
+    write_tiff(path, values, **layout)
+    x, y = cell_centers(37, 45)
+    x, y = np.meshgrid(x, y)
+    dem = akapi_dem.read_dem(path, akapi_dem.bounds_of(x, y))
+    assert dem.values.shape == values.shape
+    assert np.allclose(dem.sample(x.ravel(), y.ravel()), values.ravel(), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_sample_on_window_edges(tmp_path, monkeypatch, layout):
+    no_gdal(monkeypatch)
+    path = str(tmp_path / 'dem.tif')
+    values = heights(37, 45).astype('f4')
+    write_tiff(path, values, **layout)
+    # Points between cells, across the edges of the tiles and strips, read
+    # without a margin: the window has just the cells around the points
+    x = LEFT + np.array([15.5, 16.0, 16.75, 31.9, 32.1]) * STEP
+    y = TOP - np.array([7.6, 8.0, 8.4, 16.0, 23.99]) * STEP
+    dem = akapi_dem.read_dem(path, akapi_dem.bounds_of(x, y), margin=0)
+    assert dem.values.shape[0] < 37 and dem.values.shape[1] < 45
+    col = (x - LEFT) / STEP - 0.5
+    row = (TOP - y) / STEP - 0.5
+    assert np.allclose(dem.sample(x, y), 100.0 + 3.0 * col - 2.0 * row)
+    # Points at the outer cell centers of the raster, and outside of it
+    x, y = cell_centers(37, 45)
+    x = np.array([x[0], x[-1], x[0], x[-1], x[0] - 1.5 * STEP, x[-1] + 1.5 * STEP])
+    y = np.array([y[0], y[0], y[-1], y[-1], y[0], y[-1]])
+    dem = akapi_dem.read_dem(path, akapi_dem.bounds_of(x, y), margin=0)
+    expected = [values[0, 0], values[0, -1], values[-1, 0], values[-1, -1]]
+    assert np.allclose(dem.sample(x, y), expected + [np.nan, np.nan], rtol=0, atol=1e-9,
+                       equal_nan=True)
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_sample_without_nodata_cells(tmp_path, monkeypatch, layout):
+    no_gdal(monkeypatch)
+    path = str(tmp_path / 'dem.tif')
+    values = heights(37, 45).astype('f4')
+    values[10, 20] = NODATA
+    values[30:, 40:] = NODATA
+    write_tiff(path, values, nodata=NODATA, **layout)
+    xc, yc = cell_centers(37, 45)
+    x = np.array([xc[20] + STEP / 2, xc[42], xc[39] + STEP / 2])
+    y = np.array([yc[10], yc[33], yc[29] - STEP / 2])
+    dem = akapi_dem.read_dem(path, akapi_dem.bounds_of(x, y))
+    # The height between cells with and without data is interpolated from
+    # the cells with data; there is no height where none of the 4 cells
+    # around the point has data
+    corner = np.mean([values[29, 39], values[29, 40], values[30, 39]], dtype=float)
+    assert np.allclose(dem.sample(x, y), [values[10, 21], np.nan, corner],
+                       rtol=0, atol=1e-9, equal_nan=True)
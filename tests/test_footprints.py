@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of Create Photo Footprints - AK API
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+
+import arcpy
+import akapi_core as core
+import CreatePhotoFootprints_AKAPI_ProPy3compatible as cpf
+from akapi_storage import ArcpyStorage
+
+
+def test_photos_without_corners_are_skipped(apsi, tmp_path):
+    storage = ArcpyStorage(apsi)
+    storage.update(core.CORNER_FIELDS, core.update_photos(storage, [], None, None)[0])
+    table = arcpy.TABLES[apsi]
+    cols = [table.index(fld) for fld in core.CORNER_FIELDS]
+    # A null corner and a NaN corner (as written by earlier versions)
+    with_corners = [row for row in table.rows if row[cols[0]] is not None]
+    with_corners[0][cols[3]] = float('nan')
+    with_corners[1][cols[5]] = None
+    complete = len(with_corners) - 2
+
+    points = str(tmp_path / 'points')
+    arcpy.XYTableToPoint_management(apsi, points, 'CENTER_LON', 'CENTER_LAT', '',
+                                    cpf.spatialRef)
+    cpf.BuildPolys(points, str(tmp_path), 'footprints')
+    assert len(arcpy.TABLES[os.path.join(str(tmp_path), 'footprints')].rows) == complete
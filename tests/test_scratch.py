@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of akapi_scratch
+#
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import logging
+
+import arcpy
+from akapi_scratch import Scratch
+
+
+def test_cleanup_warns_through_the_logger(monkeypatch, caplog):
+    def delete(path):
+        raise RuntimeError('locked')
+    monkeypatch.setattr(arcpy, 'Exists', lambda path: True)
+    monkeypatch.setattr(arcpy, 'Delete_management', delete)
+    logging.getLogger('akapi').propagate = True
+    try:
+        with caplog.at_level(logging.WARNING, logger='akapi'):
+            with Scratch('workspace') as scratch:
+                path = scratch.path('points')
+    finally:
+        logging.getLogger('akapi').propagate = False
+    assert 'Could not delete {0}: locked'.format(path) in caplog.text
+    assert scratch.paths == []
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+# Name:         Tests of the AK API script tools
+#
+#   The tools are run with the parameters their toolboxes define: the arcpy
+#   stand-in raises an error, like arcpy, when a script asks for a parameter
+#   its tool does not define.
+#   Created at the National Operations Center, Bureau of Land Management.
+#
+# Created:      10/18/2026
+# ------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import arcpy
+import akapi_core as core
+import CombineTools_AKAPI as combine
+import ExportGeographicMetadata_ProPy3compatible as export
+import ImportPhotoCenters_AKAPI_ProPy3compatible as importer
+
+# Number of parameters of each tool in Alaska API Tools.tbx
+IMPORT_PARAMETERS = 9
+COMBINE_PARAMETERS = 11
+
+# Number of parameters of the tool in Export Geographic Metadata.tbx
+EXPORT_PARAMETERS = 5
+
+
+@pytest.fixture
+def photos(frames, tmp_path):
+    path = str(tmp_path / 'photos.txt')
+    frames.write_metashape(path)
+    return path
+
+
+def run(monkeypatch, tool, count, params):
+    monkeypatch.setattr(arcpy, 'PARAMETER_COUNT', count)
+    arcpy.PARAMS.clear()
+    arcpy.PARAMS.update(params)
+    tool.main()
+
+
+def import_params(photos, apsi, tmp_path):
+    return {0: photos, 1: apsi, 2: '', 3: str(tmp_path), 4: '', 5: 'false',
+            6: 'true', 7: 'true'}
+
+
+def test_import_with_toolbox_parameters(monkeypatch, photos, apsi, tmp_path):
+    run(monkeypatch, importer, IMPORT_PARAMETERS, import_params(photos, apsi, tmp_path))
+
+
+def test_combine_with_toolbox_parameters(monkeypatch, photos, apsi, tmp_path):
+    params = import_params(photos, apsi, tmp_path)
+    params[8] = 'FP'
+    run(monkeypatch, combine, COMBINE_PARAMETERS, params)
+    assert arcpy.TABLES[str(tmp_path / 'FP')].rows
+
+
+def test_interpolation_method(monkeypatch, photos, apsi, tmp_path):
+    # With the interpolation method parameter added to the tool
+    params = import_params(photos, apsi, tmp_path)
+    params[9] = 'cubic'
+    with pytest.raises(ValueError):
+        run(monkeypatch, importer, IMPORT_PARAMETERS + 1, params)
+    params[9] = 'Linear'
+    run(monkeypatch, importer, IMPORT_PARAMETERS + 1, params)
+
+
+def export_params(apsi, tmp_path):
+    return {0: apsi, 1: str(tmp_path / 'frames.txt'), 2: 'true', 3: '0', 4: '.tif'}
+
+
+def exported_frames(tmp_path):
+    with open(str(tmp_path / 'frames.txt')) as f:
+        return len(f.readlines()) - 2
+
+
+def test_export_with_toolbox_parameters(monkeypatch, frames, apsi, tmp_path):
+    run(monkeypatch, export, EXPORT_PARAMETERS, export_params(apsi, tmp_path))
+    assert exported_frames(tmp_path) == frames.n
+
+
+def test_export_selection(monkeypatch, frames, apsi, tmp_path):
+    # With the SQL expression parameter added to the tool
+    params = export_params(apsi, tmp_path)
+    params[5] = "FLIGHT_LINE_NO = '{0}'".format(frames.apsi_rows()[0][4])
+    run(monkeypatch, export, EXPORT_PARAMETERS + 1, params)
+    assert 0 < exported_frames(tmp_path) < frames.n
+
+
+def test_import_batch(monkeypatch, frames, apsi, tmp_path):
+    # A multivalue file and folder parameter: a folder of files and a file,
+    # quoted and separated by semicolons
+    folder = tmp_path / 'photo centers'
+    folder.mkdir()
+    frames.write_metashape(str(folder / 'a.txt'))
+    with open(str(folder / 'a.txt')) as f:
+        lines = f.readlines()
+    half = 2 + frames.n // 2
+    with open(str(folder / 'a.txt'), 'w') as f:
+        f.writelines(lines[:half])
+    with open(str(tmp_path / 'b.txt'), 'w') as f:
+        f.writelines(lines[:2] + lines[half:])
+
+    value = "'{0}';'{1}'".format(folder, tmp_path / 'b.txt')
+    assert len(core.list_photo_center_files(value)) == 2
+    table = arcpy.TABLES[apsi]
+    lat = table.index('CENTER_LAT')
+    for row in table.rows:
+        row[lat] = None
+    params = import_params(value, apsi, tmp_path)
+    params[7] = 'false'
+    run(monkeypatch, importer, IMPORT_PARAMETERS, params)
+    # The aligned frames of both files are imported
+    imported = [row[lat] is not None for row in table.rows]
+    assert imported == frames.aligned.tolist()
+
+
+def test_export_messages_of_worker_processes(monkeypatch, frames, apsi, tmp_path):
+    # Each input is exported by a worker process, whose messages reach the
+    # geoprocessing messages of the tool
+    arcpy.TABLES[str(tmp_path / 'APSI2')] = arcpy.TABLES[apsi]
+    monkeypatch.setattr(arcpy.env, 'parallelProcessingFactor', '2')
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    params = export_params('{0};{1}'.format(apsi, tmp_path / 'APSI2'), tmp_path)
+    params[1] = str(tmp_path)
+    del arcpy.MESSAGES[:]
+    run(monkeypatch, export, EXPORT_PARAMETERS, params)
+    messages = [msg for kind, msg in arcpy.MESSAGES]
+    assert any(msg.startswith('Exporting 2 files in 2 processes') for msg in messages)
+    assert len([msg for msg in messages if msg.startswith('exporting frames:')]) == 2